@@ -0,0 +1,166 @@
+"""
+Benchmark of worklogs import (Worklog.create_all).
+
+Compares the previous row-by-row path (one query to check and one commit
+per worklog) with the bulk path. Runs against in-memory SQLite by default,
+set TEST_DATABASE_URI to benchmark another database (e.g. Postgres):
+
+    python benchmarks/create_all.py [number of worklogs]
+"""
+import os
+import sys
+import time
+
+from datetime import datetime, timedelta
+
+import pytz
+
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # NOQA
+from flask_login import current_user, login_user  # NOQA
+from synchronizer.models import (Connector, ConnectorType,  # NOQA
+                                 Synchronization, Timezone, User, Worklog,
+                                 db, lm)
+from tests.conftest import drop_tables  # NOQA
+
+
+def generate_worklogs(count):
+    """
+    Returns raw worklogs like connectors do, about a half of them are
+    grouped with other worklogs
+    """
+    start = datetime(2020, 1, 1, tzinfo=pytz.utc)
+    worklogs = []
+    for i in range(count):
+        date_started = start + timedelta(hours=i // 2)
+        worklogs.append({
+            'source_id': str(i),
+            'comment': '[Jira:ABC-{}] Work on task'.format(i // 4),
+            'duration': 600,
+            'date_created': date_started,
+            'date_started': date_started,
+            'date_stopped': date_started + timedelta(minutes=10)
+        })
+    return worklogs
+
+
+def legacy_create_all(sync_id, raw_worklogs, connector_name):
+    """
+    Row by row import as it was done before bulk inserts
+    """
+    raw_worklogs.sort(key=lambda rw: rw['date_started'])
+    groups = {}
+    for w in raw_worklogs:
+        w['issue_id'], w['comment'] = Worklog.parse_issue_id(
+            w['comment'].strip(), connector_name
+        )
+        w['is_valid'] = bool(w['issue_id'])
+        groups.setdefault('{}-{}-{}'.format(
+            w['date_started'].date(), w['issue_id'], w['comment']
+        ), []).append(w)
+
+    for worklogs in groups.values():
+        parent_id = None
+        new_worklogs = [
+            w for w in worklogs
+            if not Worklog.query.filter_by(
+                source_id=w['source_id'],
+                user_id=current_user.get_id(),
+                is_valid=True
+            ).first()
+        ]
+        if len(new_worklogs) > 1:
+            pw = Worklog(
+                date_started=new_worklogs[0]['date_started'],
+                date_stopped=new_worklogs[-1]['date_stopped'],
+                issue_id=new_worklogs[0]['issue_id'],
+                comment=new_worklogs[0]['comment'],
+                is_valid=new_worklogs[0]['is_valid'],
+                duration=sum(w['duration'] for w in new_worklogs),
+                user_id=current_user.get_id(),
+                synchronization_id=sync_id
+            )
+            db.session.add(pw)
+            db.session.commit()
+            parent_id = pw.id
+        for w in new_worklogs:
+            db.session.add(Worklog(
+                date_started=w['date_started'],
+                date_stopped=w['date_stopped'],
+                date_created=w['date_created'],
+                issue_id=w['issue_id'],
+                comment=w['comment'],
+                is_valid=w['is_valid'],
+                source_id=w['source_id'],
+                duration=w['duration'],
+                user_id=current_user.get_id(),
+                synchronization_id=sync_id,
+                parent_id=parent_id
+            ))
+            db.session.commit()
+
+
+def run(create_all, count):
+    """
+    Imports worklogs into a new synchronization of a new user and returns
+    number of saved rows per second
+    """
+    user = User(
+        username='benchmark',
+        email='benchmark@example.com',
+        timezone=Timezone(name='UTC')
+    )
+    db.session.add(user)
+    db.session.commit()
+    connector_type = ConnectorType(name='Jira', ctype='target')
+    db.session.add(connector_type)
+    db.session.commit()
+    target = Connector.create(
+        name='Jira', server='jira.example.com', login='', password='',
+        api_token='', user_id=user.id, connector_type_id=connector_type.id
+    )
+    sync = Synchronization.create(
+        source_id=target.id, target_id=target.id,
+        date_started_from=datetime(2020, 1, 1), user_id=user.id
+    )
+    login_user(user)
+
+    worklogs = generate_worklogs(count)
+    started = time.perf_counter()
+    create_all(sync.id, worklogs, 'Jira')
+    elapsed = time.perf_counter() - started
+    return Worklog.query.filter_by(user_id=user.id).count() / elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    app = Flask('synchronizer')
+    app.config.update(
+        SECRET_KEY=os.environ['SECRET_KEY'],
+        SQLALCHEMY_DATABASE_URI=os.environ.get(
+            'TEST_DATABASE_URI', 'sqlite://'
+        ),
+        SQLALCHEMY_TRACK_MODIFICATIONS=False
+    )
+    db.init_app(app)
+    lm.init_app(app)
+
+    for name, create_all in (
+        ('row by row', legacy_create_all),
+        ('bulk', Worklog.create_all)
+    ):
+        with app.test_request_context():
+            drop_tables()
+            db.create_all()
+            print('{:>10}: {:10.0f} rows/s'.format(
+                name, run(create_all, count)
+            ))
+            db.session.remove()
+            drop_tables()
+
+
+if __name__ == '__main__':
+    main()
@@ -66,4 +66,10 @@ def create_app(dev=False):
     app.register_blueprint(auth_routes)
     app.register_blueprint(api_routes, url_prefix='/api')
 
+    from synchronizer.breakers import breakers_command
+    from synchronizer.worker import worker_command
+
+    app.cli.add_command(breakers_command)
+    app.cli.add_command(worker_command)
+
     return app
@@ -0,0 +1,35 @@
+"""Command showing circuit breakers of target hosts"""
+
+from datetime import datetime
+
+import click
+
+from synchronizer.connectors.base import HttpTransport
+
+
+@click.command('breakers')
+@click.option(
+    '--reset', 'reset_host', metavar='HOST',
+    help='Close circuit breaker of the host.'
+)
+def breakers_command(reset_host):
+    """Show circuit breakers of target hosts."""
+    breaker = HttpTransport.circuit_breaker
+    if reset_host:
+        breaker.reset(reset_host)
+        click.echo('Circuit breaker of {} is closed'.format(reset_host))
+        return
+
+    states = breaker.get_all()
+    if not states:
+        click.echo('No requests to target hosts yet')
+
+    for state in states:
+        last_failed_at = state.get('last_failed_at')
+        click.echo('{}\t{}\tfailures in a row: {}\tlast failure: {}'.format(
+            state['host'],
+            state['state'],
+            state.get('failures', 0),
+            datetime.fromtimestamp(last_failed_at).isoformat(' ', 'seconds')
+            if last_failed_at else '-'
+        ))
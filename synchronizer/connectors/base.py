@@ -1,5 +1,27 @@
 """Base connector class"""
+import copy
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlparse
+
 import iso8601
+import requests
+
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+from .breaker import CircuitBreaker
+from .ratelimit import RateLimiter
+
+
+# Default timeouts (in seconds) for all HTTP requests made by connectors
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 60))
+# Number of retries of requests rejected by rate limit of host
+HTTP_RATE_LIMIT_RETRIES = int(os.environ.get('HTTP_RATE_LIMIT_RETRIES', 3))
 
 
 class ExportException(Exception):
@@ -7,9 +29,12 @@ class ExportException(Exception):
     Custom exception class to handle errors when import or export from
     different connectors
     """
-    def __init__(self, index, message=None):
+    def __init__(self, index, message=None, indexes=None):
         self.index = index
         self.message = message
+        # Indexes of all not exported worklogs if they are not just the
+        # worklogs from index to the end (parallel export)
+        self.indexes = indexes
 
 
 class WrongIssueIDException(Exception):
@@ -19,16 +44,174 @@ class WrongIssueIDException(Exception):
     pass
 
 
+class HttpTransport(object):
+    """
+    Pooled HTTP transport. One transport (and one requests session) is
+    created per connector type and reused by all its instances within
+    worker process, so connections to every host are kept alive between
+    requests and users. Credentials are passed with every request and
+    cookies are never stored, so nothing leaks between users. Requests to
+    every host are throttled by rate limiter and stopped by circuit
+    breaker shared by all transports and worker processes
+    """
+    _transports = {}
+    _lock = threading.Lock()
+    rate_limiter = RateLimiter()
+    circuit_breaker = CircuitBreaker()
+
+    def __init__(self, name, retry=None, timeout=None, pool_maxsize=10):
+        self.name = name
+        self.timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+        self.session = requests.Session()
+        self.session.cookies.set_policy(
+            DefaultCookiePolicy(allowed_domains=[])
+        )
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry or Retry(connect=3, backoff_factor=0.5)
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @classmethod
+    def get(cls, name, **kwargs):
+        """
+        Returns shared transport by name, creates a new one if needed
+        """
+        with cls._lock:
+            if name not in cls._transports:
+                cls._transports[name] = cls(name, **kwargs)
+            return cls._transports[name]
+
+    def request(self, method, url, **kwargs):
+        """
+        Makes HTTP request, default timeouts are used if not specified.
+        Requests rejected by rate limit (429) are sent again when host
+        allows it, so they are never processed by host
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlparse(url).netloc
+
+        for attempt in range(HTTP_RATE_LIMIT_RETRIES + 1):
+            # Fail fast if host is down, don't wait for timeouts
+            self.circuit_breaker.before_request(host)
+            self.rate_limiter.acquire(host)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (
+                requests.ConnectionError, requests.Timeout,
+                requests.exceptions.RetryError
+            ):
+                # RetryError is raised when retries of 5xx responses are
+                # exhausted, it is a failure of host as well
+                self.circuit_breaker.record(host, False)
+                raise
+            self.circuit_breaker.record_response(host, response)
+            retry_after = self.rate_limiter.update(host, response)
+            if (
+                retry_after is None or response.status_code != 429
+                or retry_after > self.rate_limiter.max_wait
+            ):
+                break
+        return response
+
+
 class BaseConnector(object):
     NAME = None
     ExportException = ExportException
+    # Default number of parallel requests made by one connector
+    MAX_WORKERS = int(os.environ.get('CONNECTOR_MAX_WORKERS', 8))
+    # Retry policy and (connect, read) timeouts of connector HTTP requests
+    HTTP_RETRY = Retry(connect=3, backoff_factor=0.5)
+    HTTP_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    # Max number of issues returned by search_issues, None if not limited
+    SEARCH_LIMIT = None
 
     def __init__(self, **kwargs):
-        pass
+        self.max_workers = int(kwargs.get('max_workers') or self.MAX_WORKERS)
+        # Optional callable that gets a copy of progress on every change
+        self.progress_callback = kwargs.get('progress_callback')
+        self.progress = {
+            'phase': None, 'done': 0, 'total': None, 'requests': 0
+        }
+        self.progress_lock = threading.Lock()
+
+    def clone(self, progress_callback=None):
+        """
+        Returns shallow copy of connector with its own progress. Copies
+        share credentials and authentication made by the original
+        """
+        connector = copy.copy(self)
+        connector.progress_callback = progress_callback
+        connector.progress = {
+            'phase': None, 'done': 0, 'total': None, 'requests': 0
+        }
+        connector.progress_lock = threading.Lock()
+        return connector
+
+    @classmethod
+    def get_transport(cls):
+        """
+        Returns HTTP transport shared by all connectors of this type
+        """
+        return HttpTransport.get(
+            cls.NAME,
+            retry=cls.HTTP_RETRY,
+            timeout=cls.HTTP_TIMEOUT,
+            pool_maxsize=cls.MAX_WORKERS
+        )
+
+    def map_concurrently(self, func, items, max_workers=None):
+        """
+        Calls func for every item using a bounded pool of threads.
+        Results are returned in the same order as items, so merging them
+        stays deterministic regardless of which request finished first.
+        """
+        items = list(items)
+        max_workers = min(
+            max_workers or getattr(self, 'max_workers', self.MAX_WORKERS),
+            len(items)
+        )
+        if max_workers <= 1:
+            return [func(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(func, items))
+
+    def report_progress(self, phase=None, total=None, done=0, requests=0):
+        """
+        Updates progress of current operation and reports it to progress
+        callback. A new phase resets number of done items, `done` and
+        `requests` are increments, so threads of map_concurrently could
+        report their items independently
+        """
+        with self.progress_lock:
+            if phase is not None and phase != self.progress['phase']:
+                self.progress.update(phase=phase, done=0, total=None)
+            if total is not None:
+                self.progress['total'] = total
+            self.progress['done'] += done
+            self.progress['requests'] += requests
+            progress = dict(self.progress)
+
+        if self.progress_callback:
+            self.progress_callback(progress)
 
     def import_worklogs(self, start_date, end_date):
         raise NotImplementedError()
 
+    def iter_worklogs(self, start_date, end_date):
+        """
+        Yields imported worklogs by batches (lists of worklog dicts).
+        Connectors that fetch worklogs by parts override it, so the whole
+        history is never kept in memory
+        """
+        yield self.import_worklogs(start_date, end_date)
+
     def export_worklogs(self, worklogs):
         """
         Parameters:
@@ -45,6 +228,22 @@ class BaseConnector(object):
             return iso8601.parse_date(date_iso_str)
         return date_iso_str
 
+    def validate_issue(self, issue_id):
+        """
+        Check if issue exists in target source
+        """
+        raise NotImplementedError()
+
+    def validate_issues(self, issue_ids):
+        """
+        Returns set of existing issues from issue_ids. Every issue is
+        checked only once, connectors could check them in batches
+        """
+        return set(
+            issue_id for issue_id in set(issue_ids)
+            if self.validate_issue(issue_id)
+        )
+
     def search_issues(self, term):
         """
         Returns list of issue tuples like 
@@ -0,0 +1,127 @@
+"""Circuit breaker of unavailable target hosts"""
+import os
+import time
+
+from contextlib import contextmanager
+
+import requests
+
+from .hoststate import HostStates
+
+
+# Number of failures in a row which opens breaker of host
+HTTP_BREAKER_THRESHOLD = int(os.environ.get('HTTP_BREAKER_THRESHOLD', 5))
+# Seconds of open breaker before a probe request is let through
+HTTP_BREAKER_RESET_TIMEOUT = float(
+    os.environ.get('HTTP_BREAKER_RESET_TIMEOUT', 30)
+)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """
+    Raised instead of request to host which is known as not available
+    """
+    pass
+
+
+class CircuitBreaker(object):
+    """
+    Breaker per host shared by all worker processes of the machine. After
+    `threshold` failures in a row (connection errors, timeouts and
+    502-504 responses) it is open: requests fail at once without waiting
+    for timeouts. After `reset_timeout` seconds it is half-open: one probe
+    request is let through, its result closes or opens the breaker again
+    """
+    STATE_CLOSED = 'closed'
+    STATE_OPEN = 'open'
+    STATE_HALF_OPEN = 'half-open'
+    FAILED_STATUSES = (502, 503, 504)
+
+    def __init__(
+        self, threshold=None, reset_timeout=None, directory=None,
+        clock=time.time
+    ):
+        self.threshold = threshold or HTTP_BREAKER_THRESHOLD
+        self.reset_timeout = reset_timeout or HTTP_BREAKER_RESET_TIMEOUT
+        self.states = HostStates('breaker', directory)
+        self.clock = clock
+
+    def get_state(self, state):
+        """
+        Returns name of breaker state by its data
+        """
+        if state.get('failures', 0) < self.threshold:
+            return self.STATE_CLOSED
+        if self.clock() < state.get('opened_at', 0) + self.reset_timeout:
+            return self.STATE_OPEN
+        return self.STATE_HALF_OPEN
+
+    def before_request(self, host):
+        """
+        Raises CircuitOpenError if request to host should not be made
+        """
+        with self.states.state(host) as state:
+            breaker_state = self.get_state(state)
+            if breaker_state == self.STATE_HALF_OPEN:
+                # Let the probe through, others wait for its result
+                state['opened_at'] = self.clock()
+            elif breaker_state == self.STATE_OPEN:
+                raise CircuitOpenError(
+                    '{} is not available, next attempt in {:.0f}s'.format(
+                        host,
+                        state['opened_at'] + self.reset_timeout
+                        - self.clock()
+                    )
+                )
+
+    def record(self, host, is_success):
+        """
+        Saves result of request to host
+        """
+        with self.states.state(host) as state:
+            if is_success:
+                state['failures'] = 0
+                return
+
+            state['failures'] = state.get('failures', 0) + 1
+            state['last_failed_at'] = self.clock()
+            if state['failures'] >= self.threshold:
+                if state['failures'] == self.threshold:
+                    print('Circuit breaker of {} is open'.format(host))
+                state['opened_at'] = self.clock()
+
+    def record_response(self, host, response):
+        self.record(host, response.status_code not in self.FAILED_STATUSES)
+
+    @contextmanager
+    def guard(self, host, errors=(OSError,)):
+        """
+        Checks breaker before the block and records its result. Only the
+        given errors are failures of host, other ones are its answers
+        """
+        self.before_request(host)
+        try:
+            yield
+        except errors:
+            self.record(host, False)
+            raise
+        except Exception:
+            self.record(host, True)
+            raise
+        self.record(host, True)
+
+    def reset(self, host):
+        """
+        Closes breaker of host
+        """
+        with self.states.state(host) as state:
+            state['failures'] = 0
+
+    def get_all(self):
+        """
+        Returns states of breakers of all known hosts
+        """
+        return [
+            dict(state, state=self.get_state(state))
+            for state in self.states.get_all()
+        ]
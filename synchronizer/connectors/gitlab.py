@@ -1,26 +1,55 @@
+import hashlib
+import os
 import re
-import requests
 import urllib.parse
 
-from synchronizer.utils import DateAndTime
+from requests.packages.urllib3.util.retry import Retry
+
+from synchronizer.utils import DateAndTime, LRUCache
 from .base import BaseConnector
 
 
+# Worklogs parsed from issue notes, keyed by (server, token fingerprint,
+# project ID, issue IID, full, windowed), so notes visible with one token
+# are never returned to users of another one. Every entry keeps
+# total_time_spent of the issue when notes were scanned, so unchanged
+# issues don't need to be scanned again
+ISSUE_WORKLOGS_CACHE = LRUCache(
+    max_size=int(os.environ.get('GITLAB_ISSUE_CACHE_SIZE', 20000)),
+    ttl=int(os.environ.get('GITLAB_ISSUE_CACHE_TTL', 7 * 24 * 60 * 60))
+)
+
+
 class GitlabConnector(BaseConnector):
     NAME = 'Gitlab'
+    # Only idempotent requests are retried on server errors
+    HTTP_RETRY = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504)
+    )
+    REMOVE_REGEX = re.compile(
+        r'removed time spent'
+    )
+    # Number of issues which worklogs are imported as one batch
+    IMPORT_BATCH_SIZE = int(os.environ.get('GITLAB_IMPORT_BATCH_SIZE', 100))
 
     def __init__(self, **kwargs):
-        super(GitlabConnector, self).__init__()
+        super(GitlabConnector, self).__init__(**kwargs)
         self.server = kwargs['server']
         self.headers = {
             'Private-Token': kwargs['api_token'],
         }
+        self.token_fingerprint = hashlib.sha256(
+            (kwargs['api_token'] or '').encode('utf-8')
+        ).hexdigest()
 
-    def _api(
+    def _request(
         self, method, endpoint,
         data=None, params=None, ignore_errors=False
     ):
-        response = requests.request(
+        self.report_progress(requests=1)
+        response = self.get_transport().request(
             method,
             'https://{0}/api/v4/{1}'.format(self.server, endpoint),
             data=data,
@@ -29,7 +58,41 @@ class GitlabConnector(BaseConnector):
         )
         if not ignore_errors:
             response.raise_for_status()
-        return response.json()
+        return response
+
+    def _api(self, *args, **kwargs):
+        return self._request(*args, **kwargs).json()
+
+    def _get_pages(self, endpoint, data=None):
+        """
+        Yields pages of paginated endpoint one by one. Next page number is
+        taken from X-Next-Page or Link headers, so no extra request is made
+        to find out that the last page was already fetched
+        """
+        data = dict(data or {})
+        page = data.pop('page', 1)
+
+        while page:
+            response = self._request(
+                'get',
+                endpoint,
+                data=dict(data, page=page)
+            )
+            items = response.json()
+            if not items:
+                break
+
+            yield items
+
+            if 'X-Next-Page' in response.headers:
+                # Header is empty for the last page
+                next_page = response.headers['X-Next-Page']
+                page = int(next_page) if next_page else None
+            elif 'Link' in response.headers:
+                page = page + 1 if 'next' in response.links else None
+            else:
+                # No pagination headers, stop on empty page
+                page += 1
 
     def _get(self, *args, **kwargs):
         return self._api('get', *args, **kwargs)
@@ -37,37 +100,61 @@ class GitlabConnector(BaseConnector):
     def _post(self, *args, **kwargs):
         return self._api('post', *args, **kwargs)
 
-    def import_worklogs(self, start_date, end_date, full=False):
+    def import_worklogs(self, start_date, end_date, full=False, windowed=True):
         """
-        Run import time reports from Gitlab
+        Run import time reports from Gitlab. In windowed mode only notes
+        created after start_date are fetched
         """
-        print('Start importing worklogs from Gitlab')
         worklogs = []
+        for batch in self.iter_worklogs(start_date, end_date, full, windowed):
+            worklogs += batch
+        return worklogs
+
+    def iter_worklogs(self, start_date, end_date, full=False, windowed=True):
+        """
+        Yields worklogs of every IMPORT_BATCH_SIZE issues as a batch
+        """
+        print('Start importing worklogs from Gitlab')
         # Step 1. Fetch all issues updated after start_date and before end_date
+        self.report_progress(phase='Fetching issues')
         issues_ids = self.get_all_issues(start_date)
         print('Found {} issues to check'.format(len(issues_ids)))
-        for project_id, issue_iid in issues_ids:
-            worklogs += self.get_worklogs_from_issue(
-                project_id,
-                issue_iid,
+        # Step 2. Fetch notes of many issues in parallel. Every issue is
+        # processed as a whole by one worker, so subtract/remove notes are
+        # still applied in the order of the issue notes
+        self.report_progress(
+            phase='Fetching time spent of issues', total=len(issues_ids)
+        )
+
+        def get_issue_worklogs(issue):
+            issue_worklogs = self.get_cached_worklogs_from_issue(
+                issue[0],
+                issue[1],
+                issue[2],
                 start_date,
                 end_date,
-                full
+                full,
+                windowed
             )
-        # filter worklogs
-        # Created at date should be greated that start_date!
-        worklogs_between_dates = []
-        for w in worklogs:
-            print(GitlabConnector.parse_iso_str(w['date_started']))
-            print(GitlabConnector.parse_iso_str(start_date))
-            if (
-                GitlabConnector.parse_iso_str(w['date_started'])
-                >= GitlabConnector.parse_iso_str(start_date) and
-                GitlabConnector.parse_iso_str(w['date_started'])
-                <= GitlabConnector.parse_iso_str(end_date)
-            ):
-                worklogs_between_dates.append(w)
-        return worklogs_between_dates
+            self.report_progress(done=1)
+            return issue_worklogs
+
+        start = GitlabConnector.parse_iso_str(start_date)
+        end = GitlabConnector.parse_iso_str(end_date)
+        for i in range(0, len(issues_ids), self.IMPORT_BATCH_SIZE):
+            issues_worklogs = self.map_concurrently(
+                get_issue_worklogs, issues_ids[i:i + self.IMPORT_BATCH_SIZE]
+            )
+            # filter worklogs
+            # Created at date should be greated that start_date!
+            batch = [
+                w for issue_worklogs in issues_worklogs for w in issue_worklogs
+                if start <= GitlabConnector.parse_iso_str(
+                    w['date_started']
+                ) <= end
+            ]
+            if batch:
+                yield batch
 
     def export_worklogs(self, worklogs):
         for i, worklog in enumerate(worklogs):
@@ -94,37 +181,104 @@ class GitlabConnector(BaseConnector):
                 print(err)
                 raise self.ExportException(i)
 
+    def get_cached_worklogs_from_issue(
+        self, project_id, issue_iid, total_time_spent,
+        start_date, end_date, full=False, windowed=False
+    ):
+        """
+        Returns worklogs of issue. Notes are not fetched at all for issues
+        without time spent or when time stats of the issue were not changed
+        since the last import
+        """
+        if total_time_spent is None:
+            # Time stats are not available, so nothing to compare with
+            issue_worklogs = self.get_worklogs_from_issue(
+                project_id,
+                issue_iid,
+                start_date,
+                end_date,
+                full,
+                windowed
+            )
+            self.pop_missed_dates(issue_worklogs)
+            return issue_worklogs
+
+        if not total_time_spent:
+            return []
+
+        # Worklogs fetched for a window are valid only for the same
+        # or narrower windows
+        window_start = (
+            GitlabConnector.parse_iso_str(start_date) if windowed else None
+        )
+        cache_key = (
+            self.server, self.token_fingerprint, project_id, issue_iid, full,
+            windowed
+        )
+        cached = ISSUE_WORKLOGS_CACHE.get(cache_key)
+        if (
+            cached and cached[0] == total_time_spent
+            and (cached[1] is None or cached[1] <= window_start)
+        ):
+            # Return copies, worklogs are modified while saving
+            return [dict(w) for w in cached[2]]
+
+        issue_worklogs = self.get_worklogs_from_issue(
+            project_id,
+            issue_iid,
+            start_date,
+            end_date,
+            full,
+            windowed
+        )
+        # Dates of time spent added less than 24 hours ago are replaced
+        # with the current time, so they must not stay frozen in the cache
+        if not self.pop_missed_dates(issue_worklogs):
+            ISSUE_WORKLOGS_CACHE.set(
+                cache_key,
+                (
+                    total_time_spent,
+                    window_start,
+                    [dict(w) for w in issue_worklogs]
+                )
+            )
+        return issue_worklogs
+
+    @staticmethod
+    def pop_missed_dates(issue_worklogs):
+        """
+        Removes marks of worklogs without date in notes and returns True
+        if any worklog was marked
+        """
+        return any([
+            w.pop('is_date_missed', False) for w in issue_worklogs
+        ])
+
     def get_worklogs_from_issue(
-        self, project_id, issue_iid, start_date, end_date, full=False
+        self, project_id, issue_iid, start_date, end_date, full=False,
+        windowed=False
     ):
         """
         Fetch all worklogs from Gitlab
         """
         print('Process {}/{} issue'.format(project_id, issue_iid))
-        # TODO: use start and end date
-        page = 1
         issue_worklogs = []
-        notes = []
-        while True:
-            issue_notes = self._get(
+        if windowed:
+            notes = self.get_notes_after(project_id, issue_iid, start_date)
+        else:
+            notes = []
+            for issue_notes in self._get_pages(
                 'projects/{}/issues/{}/notes'.format(
                     project_id,
                     issue_iid
                 ),
                 data={
-                    "page": page,
                     "per_page": 100,
                     "sort": 'asc'
                 }
-            )
-
-            notes += issue_notes
-
-            if not issue_notes:
-                print('Finally, all notes is fetched!')
-                break
-
-            page += 1
+            ):
+                notes += issue_notes
+            print('Finally, all notes is fetched!')
 
         add_regex = re.compile(
             r'added ((?P<days>\d+)d\s)?((?P<hours>\d+)h\s)?'
@@ -140,9 +294,7 @@ class GitlabConnector(BaseConnector):
             r'([12]\d{3})-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])))?'
         )
 
-        remove_regex = re.compile(
-            r'removed time spent'
-        )
+        remove_regex = self.REMOVE_REGEX
 
         for note in notes:
             m = add_regex.match(note['body'])
@@ -178,7 +330,8 @@ class GitlabConnector(BaseConnector):
                         # hack for this day time spent
                         m.group('date') or DateAndTime().now()
                     ),
-                    "comment": "No comment for Gitlab spent time..."
+                    "comment": "No comment for Gitlab spent time...",
+                    "is_date_missed": not m.group('date')
                 })
             else:
                 m = subtract_regex.match(note['body'])
@@ -212,7 +365,8 @@ class GitlabConnector(BaseConnector):
                             # hack for this day time spent
                             m.group('date') or DateAndTime().now()
                         ),
-                        "comment": "No comment for Gitlab spent time..."
+                        "comment": "No comment for Gitlab spent time...",
+                        "is_date_missed": not m.group('date')
                     })
                 else:
                     if remove_regex.match(note['body']):
@@ -232,6 +386,46 @@ class GitlabConnector(BaseConnector):
                 )
         return issue_worklogs
 
+    def get_notes_after(self, project_id, issue_iid, start_date):
+        """
+        Returns notes of issue created after start_date, sorted from oldest
+        to newest. Notes are read newest-first, so paging stops as soon as
+        older notes are reached. It also stops on "removed time spent" note
+        because all time spent before it is dropped anyway.
+        Note: time could be spent for a date earlier than the note was
+        created, but never later, so older notes can't have worklogs inside
+        the window
+        """
+        start_date = GitlabConnector.parse_iso_str(start_date)
+        notes = []
+
+        for issue_notes in self._get_pages(
+            'projects/{}/issues/{}/notes'.format(
+                project_id,
+                issue_iid
+            ),
+            data={
+                "per_page": 100,
+                "order_by": 'created_at',
+                "sort": 'desc'
+            }
+        ):
+            for note in issue_notes:
+                if GitlabConnector.parse_iso_str(
+                    note['created_at']
+                ) < start_date:
+                    print('All notes after start date are fetched!')
+                    return notes[::-1]
+
+                notes.append(note)
+
+                if self.REMOVE_REGEX.match(note['body']):
+                    print('Found removed time spent, skip older notes')
+                    return notes[::-1]
+
+        print('Finally, all notes is fetched!')
+        return notes[::-1]
+
     def get_project_by_id(self, project_id):
         """
         Returns Project URL and Name by ID
@@ -250,49 +444,37 @@ class GitlabConnector(BaseConnector):
         """
         Returns list of project IDs
         """
-        page = 1
         project_ids = []
 
-        while True:
-            projects_next_page = self._get(
-                'projects',
-                data={
-                    "simple": True,
-                    "page": page,
-                    "per_page": 100
-                }
-            )
-            if not projects_next_page:
-                print('Finally, all projects is fetched!')
-                break
+        for projects_next_page in self._get_pages(
+            'projects',
+            data={
+                "simple": True,
+                "per_page": 100
+            }
+        ):
             project_ids += [x['id'] for x in projects_next_page]
-            page += 1
 
+        print('Finally, all projects is fetched!')
         return project_ids
 
     def get_all_issues(self, updated_after):
         """
-        Returns list of lists (project ID, issue IID)
+        Returns list of tuples (project ID, issue IID, total time spent)
         """
         print('Try to get all issues updated after'.format(updated_after))
-        page = 1
         issues_ids = []
 
-        while True:
+        for page, issues_next_page in enumerate(self._get_pages(
+            'issues',
+            data={
+                "scope": "all",
+                "per_page": 100,
+                "updated_after": updated_after
+                # "updated_before": updated_before
+            }
+        ), 1):
             print('Page: {}'.format(page))
-            issues_next_page = self._get(
-                'issues',
-                data={
-                    "scope": "all",
-                    "page": page,
-                    "per_page": 100,
-                    "updated_after": updated_after
-                    # "updated_before": updated_before
-                }
-            )
-            if not issues_next_page:
-                print('Finally, all issues is fetched!')
-                break
             for issue in issues_next_page:
                 print(
                     issue['project_id'],
@@ -300,10 +482,14 @@ class GitlabConnector(BaseConnector):
                     issue['web_url']
                 )
             issues_ids += [
-                (x['project_id'], x['iid']) for x in issues_next_page
+                (
+                    x['project_id'],
+                    x['iid'],
+                    (x.get('time_stats') or {}).get('total_time_spent')
+                ) for x in issues_next_page
             ]
-            page += 1
 
+        print('Finally, all issues is fetched!')
         return issues_ids
 
     def convert_to_hr(self, seconds):
@@ -0,0 +1,107 @@
+"""State of target hosts shared by worker processes"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not a POSIX system, state is shared by threads only
+    fcntl = None
+
+
+# Directory with state of hosts (rate limits, circuit breakers) shared by
+# all processes of the machine
+HTTP_STATE_DIR = os.environ.get(
+    'HTTP_STATE_DIR',
+    os.path.join(tempfile.gettempdir(), 'synchronizer-hosts')
+)
+
+
+class HostStates(object):
+    """
+    Small JSON states of hosts kept in files. Every file is locked while
+    its state is used, so changes made by different threads and processes
+    don't overwrite each other. If the directory is not available, states
+    are kept by this process only
+    """
+    def __init__(self, kind, directory=None):
+        self.kind = kind
+        self.directory = directory or HTTP_STATE_DIR
+        self._lock = threading.Lock()
+        # States of hosts which files are not available
+        self._states = {}
+
+    def get_path(self, host):
+        return os.path.join(self.directory, '{}.{}.json'.format(
+            hashlib.sha1(host.encode()).hexdigest(), self.kind
+        ))
+
+    @contextmanager
+    def state(self, host):
+        """
+        Yields locked state of host (a dict), changes of the dict are saved
+        """
+        with self._lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                fd = os.open(
+                    self.get_path(host), os.O_RDWR | os.O_CREAT, 0o600
+                )
+            except OSError as err:
+                if host not in self._states:
+                    print(err)
+                yield self._states.setdefault(host, {'host': host})
+                return
+
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                state = self.read(fd)
+                state['host'] = host
+
+                yield state
+
+                data = json.dumps(state).encode()
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+    @staticmethod
+    def read(fd):
+        try:
+            return json.loads(os.read(fd, 4096).decode() or '{}')
+        except ValueError:
+            return {}
+
+    def get_all(self):
+        """
+        Returns states of all known hosts sorted by host
+        """
+        states = list(self._states.values())
+        suffix = '.{}.json'.format(self.kind)
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            names = []
+
+        for name in names:
+            if not name.endswith(suffix):
+                continue
+            try:
+                fd = os.open(os.path.join(self.directory, name), os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                state = self.read(fd)
+            finally:
+                os.close(fd)
+            if state.get('host'):
+                states.append(state)
+
+        return sorted(states, key=lambda s: s['host'])
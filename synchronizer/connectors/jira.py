@@ -1,30 +1,44 @@
+import os
 import re
+import threading
 import requests
 
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
-
 from .base import BaseConnector, WrongIssueIDException
 
+# Number of worklogs exported in parallel. It could be set for every
+# server like "jira.example.com=2,other.example.com=8"
+JIRA_EXPORT_WORKERS = int(os.environ.get('JIRA_EXPORT_WORKERS', 4))
+JIRA_EXPORT_WORKERS_BY_SERVER = {
+    server.strip(): int(workers)
+    for server, workers in (
+        item.split('=') for item in os.environ.get(
+            'JIRA_EXPORT_WORKERS_BY_SERVER', ''
+        ).split(',') if item.strip()
+    )
+}
+
 
 class JiraConnector(BaseConnector):
     NAME = 'Jira'
     FORM_FIELDS = ['name', 'server', 'login', 'api_token', ]
+    # Max number of issues checked by one search request
+    VALIDATE_BATCH_SIZE = 200
+    SEARCH_LIMIT = 50
 
     def __init__(self, **kwargs):
+        super(JiraConnector, self).__init__(**kwargs)
         self.server = kwargs['server']
         self.auth = requests.auth.HTTPBasicAuth(
             kwargs['login'],
             kwargs['api_token']
         )
-        # Apply delays between attempts to connection to
-        # jira server in case of maximum requests quota
-        self.session = requests.Session()
-        self.retry = Retry(connect=3, backoff_factor=0.5)
-        self.adapter = HTTPAdapter(max_retries=self.retry)
-        self.session.mount('https://', self.adapter)
+        # Connections are pooled and retried (with delays between attempts
+        # to connect to jira server in case of maximum requests quota)
+        # by the shared transport
+        self.session = self.get_transport()
 
     def _api(self, method, endpoint, data=None, params=None):
+        self.report_progress(requests=1)
         response = self.session.request(
             method,
             'https://{0}/rest/api/2/{1}'.format(self.server, endpoint),
@@ -49,29 +63,73 @@ class JiraConnector(BaseConnector):
     def import_worklogs(self, start_date, end_date):
         raise NotImplementedError('Import for Jira is not implemented')
 
+    def get_export_workers(self):
+        """
+        Returns number of worklogs exported to the server in parallel
+        """
+        return JIRA_EXPORT_WORKERS_BY_SERVER.get(
+            self.server, JIRA_EXPORT_WORKERS
+        )
+
     def export_worklogs(self, worklogs):
-        for i, worklog in enumerate(worklogs):
+        worklogs = list(worklogs)
+        self.report_progress(phase='Exporting worklogs', total=len(worklogs))
+
+        # Requests are made by threads, so data is taken from worklogs
+        # (and their database session) before
+        payloads = [
+            (worklog.issue_id, {
+                'started': self.convert_datetime(worklog.date_started),
+                'timeSpentSeconds': self.round_seconds(worklog.duration),
+                'comment': worklog.comment
+            })
+            for worklog in worklogs
+        ]
+        failed = threading.Event()
+
+        def export(payload):
+            """
+            Returns True if worklog is exported, False if its issue is
+            wrong and None if it is not exported
+            """
+            if failed.is_set():
+                # Don't start new requests after an error
+                return None
+            issue_id, data = payload
             try:
-                data = {
-                    'started': self.convert_datetime(worklog.date_started),
-                    'timeSpentSeconds': self.round_seconds(
-                        worklog.duration
-                    ),
-                    'comment': worklog.comment
-                }
                 self._post(
-                    'issue/{0}/worklog'.format(worklog.issue_id),
+                    'issue/{0}/worklog'.format(issue_id),
                     data,
                     params={'notifyUsers': 'false'}
                 )
             except WrongIssueIDException:
                 # When we got 404 error - wrong issue ID specified
-                # Mark worklog as invalid
-                worklog.update(is_valid=False)
+                self.report_progress(done=1)
+                return False
             except Exception as err:
                 # All other errors should be raised
                 print(err)
-                raise self.ExportException(i)
+                failed.set()
+                return None
+            self.report_progress(done=1)
+            return True
+
+        results = self.map_concurrently(
+            export, payloads, max_workers=self.get_export_workers()
+        )
+
+        for worklog, is_exported in zip(worklogs, results):
+            if is_exported is False:
+                # Mark worklog as invalid
+                worklog.update(is_valid=False)
+
+        not_exported = [
+            i for i, is_exported in enumerate(results) if is_exported is None
+        ]
+        if not_exported:
+            raise self.ExportException(
+                not_exported[0], indexes=not_exported
+            )
 
     def validate_issue(self, issue_id):
         """
@@ -86,6 +144,79 @@ class JiraConnector(BaseConnector):
         except WrongIssueIDException:
             return False
 
+    def validate_issues(self, issue_ids):
+        """
+        Check which issues exist in JIRA. Issues are deduplicated and
+        checked in batches with JQL "issue in (...)" search requests.
+
+        :param issue_ids: Issue ids of tasks in target source
+        :rtype: set
+        """
+        issue_ids = sorted(set(i for i in issue_ids if i))
+        existing_ids = set()
+        self.report_progress(phase='Validating issues', total=len(issue_ids))
+
+        for start in range(0, len(issue_ids), self.VALIDATE_BATCH_SIZE):
+            batch = issue_ids[start:start + self.VALIDATE_BATCH_SIZE]
+            try:
+                found = self.search_existing_issues(batch)
+            except WrongIssueIDException:
+                # Broken JQL, check issues one by one
+                existing_ids |= super(JiraConnector, self).validate_issues(
+                    batch
+                )
+                continue
+
+            # Issues could be found by ID or key (keys are case insensitive)
+            matched = set(
+                i for i in batch if i in found or i.upper() in found
+            )
+            existing_ids |= matched
+
+            # Moved issues are returned with a new key, so check issues
+            # that were not matched separately (found contains both key
+            # and ID of every issue)
+            if len(found) > 2 * len(matched):
+                existing_ids |= super(JiraConnector, self).validate_issues(
+                    set(batch) - matched
+                )
+            self.report_progress(done=len(batch))
+
+        return existing_ids
+
+    def search_existing_issues(self, issue_ids):
+        """
+        Returns set of keys and IDs of found issues
+        """
+        jql = 'issue in ({})'.format(', '.join(
+            '"{}"'.format(i.replace('\\', '\\\\').replace('"', '\\"'))
+            for i in issue_ids
+        ))
+        found = set()
+        start_at = 0
+
+        while True:
+            res = self._post(
+                'search',
+                {
+                    'jql': jql,
+                    'fields': ['key'],
+                    'startAt': start_at,
+                    'maxResults': len(issue_ids),
+                    # Don't fail on keys of not existing issues
+                    'validateQuery': 'warn'
+                }
+            )
+            for issue in res['issues']:
+                found.add(issue['key'])
+                found.add(issue['id'])
+
+            start_at += len(res['issues'])
+            if not res['issues'] or start_at >= res['total']:
+                break
+
+        return found
+
 
     @staticmethod
     def round_seconds(seconds):
@@ -127,7 +258,8 @@ class JiraConnector(BaseConnector):
             'search',
             params={
                 'jql':  search_condition.format(term),
-                'fields': ['summary']})
+                'fields': ['summary'],
+                'maxResults': self.SEARCH_LIMIT})
 
         results = [
             {'id': i['key'], 'name': i['fields']['summary']}
@@ -135,14 +267,14 @@ class JiraConnector(BaseConnector):
         ]
         return results
 
-    @staticmethod
-    def validate(**kwargs):
+    @classmethod
+    def validate(cls, **kwargs):
         auth = requests.auth.HTTPBasicAuth(
             kwargs['login'],
             kwargs['api_token']
         )
 
-        response = requests.request(
+        response = cls.get_transport().request(
             "GET",
             "https://{0}/rest/api/2/myself".format(kwargs['server']),
             auth=auth,
@@ -1,3 +1,7 @@
+import os
+
+from synchronizer.utils import LRUCache
+
 from .gitlab import GitlabConnector
 from .jira import JiraConnector
 from .odoo import OdooConnector
@@ -10,6 +14,12 @@ class ConnectorManager(object):
         JiraConnector, TogglConnector,
         GitlabConnector, OdooConnector
     ]
+    # Live connector instances of this process by connector ID. Instances
+    # not used for POOL_IDLE_TIMEOUT seconds are dropped
+    POOL = LRUCache(
+        max_size=int(os.environ.get('CONNECTOR_POOL_SIZE', 128)),
+        ttl=int(os.environ.get('CONNECTOR_POOL_IDLE_TIMEOUT', 10 * 60))
+    )
 
     def __init__(self):
         pass
@@ -29,3 +39,38 @@ class ConnectorManager(object):
         raise NotImplementedError(
             'Connector with name {} is not implemented'.format(connector_name)
         )
+
+    @classmethod
+    def get_pooled_connector(
+        cls, connector_id, fingerprint, get_kwargs, progress_callback=None
+    ):
+        """
+        Returns connector from pool of live instances. A new instance is
+        created with (connector name, kwargs) returned by get_kwargs only if
+        there is no instance for connector_id or it was created with other
+        credentials (fingerprint). Every caller gets its own copy of pooled
+        instance, so progress is not shared between them
+        """
+        fingerprint_and_connector = cls.POOL.get(connector_id)
+        if (
+            fingerprint_and_connector is None
+            or fingerprint_and_connector[0] != fingerprint
+        ):
+            connector_name, kwargs = get_kwargs()
+            fingerprint_and_connector = (
+                fingerprint,
+                cls.create_connector(connector_name, **kwargs)
+            )
+
+        # Set it again to postpone expiration of used instance
+        cls.POOL.set(connector_id, fingerprint_and_connector)
+        return fingerprint_and_connector[1].clone(
+            progress_callback=progress_callback
+        )
+
+    @classmethod
+    def invalidate(cls, connector_id):
+        """
+        Removes instance of connector from pool
+        """
+        cls.POOL.pop(connector_id)
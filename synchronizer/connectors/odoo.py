@@ -1,62 +1,129 @@
+import hashlib
+import logging
+import os
 import xmlrpc.client
 
+from synchronizer.utils import LRUCache
 from .base import BaseConnector
 
 
+logger = logging.getLogger(__name__)
+
+# Found records, keyed by (server URL, db, model, name). Projects keep
+# (project ID, analytic account ID), tasks are named by (project ID,
+# ref_num) and keep task ID
+LOOKUP_CACHE = LRUCache(
+    max_size=int(os.environ.get('ODOO_LOOKUP_CACHE_SIZE', 10000)),
+    ttl=int(os.environ.get('ODOO_LOOKUP_CACHE_TTL', 60 * 60))
+)
+# User identifiers, keyed by (server URL, db, login). Every entry keeps
+# hash of password it was got with
+UID_CACHE = LRUCache(
+    max_size=int(os.environ.get('ODOO_UID_CACHE_SIZE', 1000)),
+    ttl=int(os.environ.get('ODOO_UID_CACHE_TTL', 60 * 60))
+)
+
+
+class SessionTransport(xmlrpc.client.Transport):
+    """
+    XML-RPC transport which sends requests with pooled HTTP transport of
+    connector, so connections are kept alive and shared by all threads,
+    and requests are throttled by rate limiter and circuit breaker
+    """
+    def __init__(self, http_transport, scheme):
+        super(SessionTransport, self).__init__()
+        self.http_transport = http_transport
+        self.scheme = scheme
+
+    def request(self, host, handler, request_body, verbose=False):
+        response = self.http_transport.request(
+            'POST',
+            '{}://{}{}'.format(self.scheme, host, handler),
+            data=request_body,
+            headers={
+                'Content-Type': 'text/xml',
+                'User-Agent': self.user_agent
+            }
+        )
+        if response.status_code != 200:
+            raise xmlrpc.client.ProtocolError(
+                host + handler,
+                response.status_code,
+                response.reason,
+                response.headers
+            )
+
+        parser, unmarshaller = self.getparser()
+        parser.feed(response.content)
+        parser.close()
+        return unmarshaller.close()
+
+
 class OdooConnector(BaseConnector):
     NAME = 'Odoo'
-    PROJECT_NAME_TO_PROJECT_ID_MAPPING = {}
-    PROJECT_NAME_TO_ACCOUNT_ID_MAPPING = {}
+    # Number of timesheets created by one request and number of tasks
+    # searched by one request
+    EXPORT_BATCH_SIZE = 100
+    SEARCH_BATCH_SIZE = 200
 
     def __init__(self, **kwargs):
+        super(OdooConnector, self).__init__(**kwargs)
         self.url, self.db = kwargs['server'].rsplit(':', 1)
-        self.username = kwargs['login'],
+        self.username = kwargs['login']
         self.password = kwargs['password']
-        self.common = xmlrpc.client.ServerProxy(
-            '{}/xmlrpc/2/common'.format(self.url)
-        )
-        self.models = xmlrpc.client.ServerProxy(
-            '{}/xmlrpc/2/object'.format(self.url)
-        )
+        self.common = self.get_server_proxy('common')
+        self.models = self.get_server_proxy('object')
+
+        # get a user identifier, it's the same for all connectors of user
+        uid_key = (self.url, self.db, self.username)
+        password_hash = hashlib.sha256(
+            (self.password or '').encode('utf-8')
+        ).hexdigest()
+        cached = UID_CACHE.get(uid_key)
+        if cached and cached[0] == password_hash:
+            self.uid = cached[1]
+        else:
+            self.uid = self.common.authenticate(
+                self.db,
+                self.username,
+                self.password,
+                {}
+            )
+            if self.uid:
+                UID_CACHE.set(uid_key, (password_hash, self.uid))
 
-        # get a user identifier
-        self.uid = self.common.authenticate(
-            self.db,
-            self.username,
-            self.password,
-            {}
+    def get_server_proxy(self, service):
+        """
+        Returns XML-RPC proxy of service. Proxies are thread safe, because
+        they send requests with shared HTTP transport
+        """
+        url = '{}/xmlrpc/2/{}'.format(self.url, service)
+        return xmlrpc.client.ServerProxy(
+            url,
+            transport=SessionTransport(
+                self.get_transport(), url.split(':', 1)[0]
+            )
         )
 
     def _api(self, method, endpoint, data=None, params=None):
-        if params:
-            print("""
-            self.models.execute_kw(
-                self.db, self.uid, self.password,
-                {}, {},
-                {},
-                {}
+        self.report_progress(requests=1)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                'execute_kw(%s, %s, %s, %s, %s)',
+                self.db, endpoint, method, data, params
             )
-            """.format(endpoint, method, data, params))
-            response = self.models.execute_kw(
+        if params:
+            return self.models.execute_kw(
                 self.db, self.uid, self.password,
                 endpoint, method,
                 data,
                 params
             )
-        else:
-            print("""
-            self.models.execute_kw(
-                self.db, self.uid, self.password,
-                {}, {},
-                {}
-            )
-            """.format(endpoint, method, data))
-            response = self.models.execute_kw(
-                self.db, self.uid, self.password,
-                endpoint, method,
-                data
-            )
-        return response
+        return self.models.execute_kw(
+            self.db, self.uid, self.password,
+            endpoint, method,
+            data
+        )
 
     def _get(self, *args, **kwargs):
         pass
@@ -68,109 +135,218 @@ class OdooConnector(BaseConnector):
         raise NotImplementedError('Import for Jira is not implemented')
 
     def export_worklogs(self, worklogs):
-        for i, worklog in enumerate(worklogs):
+        """
+        Creates timesheets of worklogs by batches. Projects and tasks of
+        all worklogs are found first, so the number of requests doesn't
+        depend on the number of worklogs
+        """
+        worklogs = list(worklogs)
+        self.report_progress(phase='Exporting worklogs', total=len(worklogs))
+
+        issues = []
+        for worklog in worklogs:
             try:
-                project_name, ref_num = worklog.issue_id.split('#')
-                print([worklog['issue_id'], project_name, ref_num])
-                project_id, account_id \
-                    = self.get_project_and_account_id(project_name)
-                task_id = self.get_task_id(project_id, ref_num)
-                print([project_id, account_id, task_id])
-
-                new_timesheet = self.generate_empty_timesheet()
-
-                new_timesheet.update({
-                    'task_id': task_id,
-                    'name': worklog.comment,
-                    'date': self.convert_datetime(worklog.date_started),
-                    'work_type': 'dev',
-                    'unit_amount': worklog.duration/60/60,  # decimal
-                    'account_id': account_id
-                })
-
-                new_timesheet_id = self._api(
-                    'create',
-                    'hr.analytic.timesheet',
-                    data=[
-                        new_timesheet
-                    ]
+                project_name, ref_num = (worklog.issue_id or '').split('#')
+            except ValueError:
+                project_name, ref_num = None, None
+            issues.append((project_name, ref_num))
+
+        try:
+            projects = self.get_projects_and_account_ids(set(
+                project_name for project_name, _ in issues if project_name
+            ))
+            task_ids = self.get_task_ids(set(
+                (projects[project_name][0], ref_num)
+                for project_name, ref_num in issues
+                if projects.get(project_name, (None, None))[1]
+            ))
+        except xmlrpc.client.Fault as err:
+            print(err.faultString)
+            raise self.ExportException(0, err.faultString)
+        except Exception as err:
+            print(err)
+            raise self.ExportException(0)
+
+        # Worklogs before the first wrong one are exported, like in
+        # sequential export
+        timesheets = []
+        error = None
+        for i, (project_name, ref_num) in enumerate(issues):
+            project_id, account_id = projects.get(project_name, (None, None))
+            task_id = task_ids.get((project_id, ref_num))
+            if not project_name:
+                error = 'Wrong issue ID: {}'.format(worklogs[i].issue_id)
+            elif not project_id:
+                error = 'No project ID found for name: {}'.format(
+                    project_name
+                )
+            elif not account_id:
+                error = 'No analytic_account_id for project: {} ({})'.format(
+                    project_name, project_id
                 )
+            elif not task_id:
+                error = 'Cannot found task ID for project_id/ref_num: ' \
+                    '{}/{}'.format(project_id, ref_num)
+            if error:
+                print(error)
+                break
+
+            timesheets.append({
+                'task_id': task_id,
+                'name': worklogs[i].comment,
+                'date': self.convert_datetime(worklogs[i].date_started),
+                'work_type': 'dev',
+                'unit_amount': worklogs[i].duration/60/60,  # decimal
+                'account_id': account_id
+            })
 
-                if not new_timesheet_id:
-                    raise Exception('Not new timesheet id returned')
-            except xmlrpc.client.Fault as err:
-                print(err.faultString)
-                raise self.ExportException(i, err.faultString)
-            except Exception as err:
-                print(err)
-                raise self.ExportException(i)
+        if timesheets:
+            self.create_timesheets(timesheets)
+        if error:
+            raise self.ExportException(len(timesheets), error)
 
-    def get_project_and_account_id(self, project_name):
+    def create_timesheets(self, timesheets):
         """
-        Returns account_id for specified project
+        Creates timesheets with one request per EXPORT_BATCH_SIZE of them.
+        If a batch fails, its timesheets are created one by one to find
+        the failed one
         """
-        if not project_name:
-            raise Exception('No project ID specified')
+        empty_timesheet = self.generate_empty_timesheet()
+        timesheets = [
+            dict(empty_timesheet, **timesheet) for timesheet in timesheets
+        ]
+        # Old API creates only one record per request
+        is_batch_supported = True
+
+        for start in range(0, len(timesheets), self.EXPORT_BATCH_SIZE):
+            batch = timesheets[start:start + self.EXPORT_BATCH_SIZE]
+            if is_batch_supported and len(batch) > 1:
+                try:
+                    self.create_timesheet(batch, start, is_batch=True)
+                    self.report_progress(done=len(batch))
+                    continue
+                except xmlrpc.client.Fault as err:
+                    # Nothing of the batch is created in case of error
+                    print(err.faultString)
+
+            for i, timesheet in enumerate(batch, start):
+                self.create_timesheet(timesheet, i)
+                self.report_progress(done=1)
+            is_batch_supported = False
+
+    def create_timesheet(self, data, index, is_batch=False):
+        """
+        Creates timesheet or list of timesheets. Raises ExportException
+        with the given index if it's failed, faults of batches are raised
+        as is
+        """
+        try:
+            new_timesheet_id = self._api(
+                'create',
+                'hr.analytic.timesheet',
+                data=[
+                    data
+                ]
+            )
+
+            if not new_timesheet_id:
+                raise Exception('Not new timesheet id returned')
+        except xmlrpc.client.Fault as err:
+            if is_batch:
+                raise
+            print(err.faultString)
+            raise self.ExportException(index, err.faultString)
+        except Exception as err:
+            print(err)
+            raise self.ExportException(index)
+        return new_timesheet_id
 
+    def get_projects_and_account_ids(self, project_names):
+        """
+        Returns dict {project name: (project ID, account ID)} of found
+        projects. Account ID is None if project has no analytic account
+        """
+        projects = {}
+        not_cached_names = []
         # check if account_id was already fetched
         # to avoid additional requests
-        if project_name in self.PROJECT_NAME_TO_PROJECT_ID_MAPPING:
-            return (
-                self.PROJECT_NAME_TO_PROJECT_ID_MAPPING[project_name],
-                self.PROJECT_NAME_TO_ACCOUNT_ID_MAPPING[project_name]
+        for project_name in project_names:
+            cached = LOOKUP_CACHE.get(
+                self.get_cache_key('project.project', project_name)
             )
+            if cached:
+                projects[project_name] = cached
+            elif project_name:
+                not_cached_names.append(project_name)
 
-        [project_id] = self._api(
-            'search',
-            'project.project',
-            data=[[['name', '=', project_name]]]
-        )
-
-        if not project_id:
-            raise Exception('No project ID found for name: {}'.format(
-                project_name
-            ))
+        if not not_cached_names:
+            return projects
 
-        project = self._api(
-            'read',
+        found = self._api(
+            'search_read',
             'project.project',
-            data=[project_id],
+            data=[[['name', 'in', not_cached_names]]],
             params={'fields': ['id', 'name', 'analytic_account_id']}
         )
+        for project in found:
+            account_id = project['analytic_account_id'] \
+                and project['analytic_account_id'][0]
+            if not account_id:
+                projects[project['name']] = (project['id'], None)
+                continue
 
-        if (
-            'analytic_account_id' not in project
-            or not project['analytic_account_id']
-        ):
-            raise Exception(
-                'No analytic_account_id for project: {} ({})'.format(
-                    project_name, project_id
-                )
+            projects[project['name']] = (project['id'], account_id)
+            LOOKUP_CACHE.set(
+                self.get_cache_key('project.project', project['name']),
+                projects[project['name']]
             )
-        account_id = project['analytic_account_id'][0]
+        return projects
 
-        self.PROJECT_NAME_TO_PROJECT_ID_MAPPING[project_name] = project_id
-        self.PROJECT_NAME_TO_ACCOUNT_ID_MAPPING[project_name] = account_id
-        return project_id, account_id
-
-    def get_task_id(self, project_id, ref_num):
+    def get_task_ids(self, project_ids_and_ref_nums):
         """
-        Get task ID by ref_num
+        Returns dict {(project ID, ref_num): task ID} of found tasks. Tasks
+        are searched by batches with OR domains
         """
-        [task_id] = self._api(
-            'search',
-            'project.task',
-            data=[[['project_id', '=', project_id], ['ref_num', '=', ref_num]]]
-        )
+        task_ids = {}
+        pairs = []
+        for pair in sorted(project_ids_and_ref_nums):
+            cached = LOOKUP_CACHE.get(self.get_cache_key('project.task', pair))
+            if cached:
+                task_ids[pair] = cached
+            else:
+                pairs.append(pair)
 
-        if not task_id:
-            raise Exception(
-                'Cannot found task ID for project_id/ref_num: {}/{}'.format(
-                    project_id,
-                    ref_num
-                )
+        for start in range(0, len(pairs), self.SEARCH_BATCH_SIZE):
+            batch = pairs[start:start + self.SEARCH_BATCH_SIZE]
+            # Domain in Polish notation: | | & A B & C D & E F
+            domain = ['|'] * (len(batch) - 1)
+            for project_id, ref_num in batch:
+                domain += [
+                    '&',
+                    ['project_id', '=', project_id],
+                    ['ref_num', '=', ref_num]
+                ]
+
+            tasks = self._api(
+                'search_read',
+                'project.task',
+                data=[domain],
+                params={'fields': ['id', 'project_id', 'ref_num']}
             )
-        return task_id
+            for task in tasks:
+                key = (task['project_id'][0], str(task['ref_num']))
+                if key not in task_ids:
+                    task_ids[key] = task['id']
+                    LOOKUP_CACHE.set(
+                        self.get_cache_key('project.task', key), task['id']
+                    )
+        return task_ids
+
+    def get_cache_key(self, model, name):
+        """
+        Returns key of LOOKUP_CACHE for record of this server and db
+        """
+        return (self.url, self.db, model, name)
 
     def generate_empty_timesheet(self):
         """
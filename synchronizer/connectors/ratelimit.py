@@ -0,0 +1,167 @@
+"""Rate limiter of requests to target hosts"""
+import os
+import time
+
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+import iso8601
+
+from .hoststate import HostStates
+
+
+# Requests per second and burst allowed to one host by all processes
+HTTP_RATE_LIMIT = float(os.environ.get('HTTP_RATE_LIMIT', 10))
+HTTP_RATE_BURST = float(os.environ.get('HTTP_RATE_BURST', 10))
+# Max time (in seconds) a request waits for the limiter
+HTTP_RATE_MAX_WAIT = float(os.environ.get('HTTP_RATE_MAX_WAIT', 60))
+
+
+class RateLimiter(object):
+    """
+    Token bucket per host. Buckets are shared by all worker processes of
+    the machine, so they share the same quota. Rate is lowered when host
+    answers with 429 or tells that the quota is close to the end
+    (Retry-After and RateLimit-* headers), and slowly restored by
+    successful responses
+    """
+    # Part of rate restored by every successful response
+    RATE_STEP = 0.05
+    # Rate is never lowered below this part of max rate
+    MIN_RATE_PART = 0.05
+
+    def __init__(
+        self, rate=None, burst=None, max_wait=None, directory=None,
+        clock=time.time, sleep=time.sleep
+    ):
+        self.max_rate = rate or HTTP_RATE_LIMIT
+        self.burst = burst or HTTP_RATE_BURST
+        self.max_wait = HTTP_RATE_MAX_WAIT if max_wait is None else max_wait
+        self.states = HostStates('rate', directory)
+        self.clock = clock
+        self.sleep = sleep
+
+    @contextmanager
+    def state(self, host):
+        """
+        Yields bucket of host (a dict) locked for other threads and
+        processes, changes of the dict are saved
+        """
+        with self.states.state(host) as state:
+            yield self.refill(state)
+
+    def refill(self, state):
+        """
+        Fills bucket with tokens for the time passed since its last use
+        """
+        now = self.clock()
+        state.setdefault('rate', self.max_rate)
+        state.setdefault('tokens', self.burst)
+        state.setdefault('blocked_until', 0)
+        state['tokens'] = min(
+            self.burst,
+            state['tokens']
+            + max(now - state.get('updated', now), 0) * state['rate']
+        )
+        state['updated'] = now
+        return state
+
+    def acquire(self, host):
+        """
+        Waits until a request could be sent to host, but not longer than
+        max_wait seconds. Returns number of seconds waited
+        """
+        waited = 0
+        while True:
+            with self.state(host) as state:
+                now = self.clock()
+                if now < state['blocked_until']:
+                    wait = state['blocked_until'] - now
+                elif state['tokens'] >= 1:
+                    state['tokens'] -= 1
+                    return waited
+                else:
+                    wait = (1 - state['tokens']) / state['rate']
+
+            wait = min(wait, self.max_wait - waited)
+            if wait <= 0:
+                # Waited long enough, the request will show what's wrong
+                return waited
+            self.sleep(wait)
+            waited += wait
+
+    def update(self, host, response):
+        """
+        Adapts rate of host to its response. Returns number of seconds to
+        wait before retry if request was rejected, otherwise None
+        """
+        headers = response.headers
+        now = self.clock()
+        retry_after = self.parse_delay(headers.get('Retry-After'), now)
+        remaining = self.parse_number(
+            headers.get('RateLimit-Remaining')
+            or headers.get('X-RateLimit-Remaining')
+        )
+        reset_after = self.parse_delay(
+            headers.get('RateLimit-Reset')
+            or headers.get('X-RateLimit-Reset'),
+            now
+        )
+        is_limited = response.status_code == 429 or (
+            response.status_code == 503 and retry_after is not None
+        )
+
+        with self.state(host) as state:
+            min_rate = self.max_rate * self.MIN_RATE_PART
+            if is_limited:
+                # Back off: all processes wait and continue at half rate
+                state['rate'] = max(state['rate'] / 2, min_rate)
+                state['tokens'] = 0
+                if retry_after is None:
+                    retry_after = 1 / state['rate']
+                state['blocked_until'] = max(
+                    state['blocked_until'], now + retry_after
+                )
+            elif remaining is not None and reset_after:
+                # Spread the rest of the quota over the time left
+                state['rate'] = min(
+                    max(remaining / reset_after, min_rate), self.max_rate
+                )
+                state['tokens'] = min(state['tokens'], remaining)
+            else:
+                state['rate'] = min(
+                    state['rate'] + self.max_rate * self.RATE_STEP,
+                    self.max_rate
+                )
+
+        return retry_after if is_limited else None
+
+    @staticmethod
+    def parse_number(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    @classmethod
+    def parse_delay(cls, value, now):
+        """
+        Returns seconds from now till the time of header. The header is
+        number of seconds, UNIX time, HTTP or ISO 8601 date
+        """
+        if not value:
+            return None
+
+        seconds = cls.parse_number(value)
+        if seconds is None:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - now
+            except (TypeError, ValueError):
+                try:
+                    seconds = iso8601.parse_date(value).timestamp() - now
+                except iso8601.ParseError:
+                    return None
+        elif seconds > 10 ** 9:
+            seconds -= now
+
+        return max(seconds, 0)
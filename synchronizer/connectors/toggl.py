@@ -1,21 +1,30 @@
 import requests
 
+from requests.packages.urllib3.util.retry import Retry
+
 from .base import BaseConnector
 
 
 class TogglConnector(BaseConnector):
     NAME = 'Toggl'
     FORM_FIELDS = ['name', 'api_token', ]
+    # Only idempotent requests are retried on server errors
+    HTTP_RETRY = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504)
+    )
 
     def __init__(self, **kwargs):
-        super(TogglConnector, self).__init__()
+        super(TogglConnector, self).__init__(**kwargs)
         self.auth = requests.auth.HTTPBasicAuth(
             kwargs['api_token'],
             'api_token'
         )
 
     def _api(self, method, endpoint, data=None, params=None):
-        response = requests.request(
+        self.report_progress(requests=1)
+        response = self.get_transport().request(
             method,
             'https://api.track.toggl.com/api/v9/me/{0}'.format(endpoint),
             json=data,
@@ -37,6 +46,7 @@ class TogglConnector(BaseConnector):
             'start_date': start_date[:10],
             'end_date': end_date[:10]
         }
+        self.report_progress(phase='Fetching time entries')
         resp = self._get('time_entries', params=params)
         # filter duration less than zero for currently running time entries
         worklogs = [self.form_worklog(x) for x in resp if x['duration'] > 0]
@@ -57,14 +67,14 @@ class TogglConnector(BaseConnector):
         raise NotImplementedError('Export for Toggl is not implemented')
 
 
-    @staticmethod
-    def validate(**kwargs):
+    @classmethod
+    def validate(cls, **kwargs):
         auth = requests.auth.HTTPBasicAuth(
             kwargs["api_token"],
             'api_token'
         )
 
-        response = requests.request(
+        response = cls.get_transport().request(
             "GET",
             "https://api.track.toggl.com/api/v9/me",
             auth=auth,
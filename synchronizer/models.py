@@ -1,13 +1,17 @@
+import hashlib
 import os
 import re
+import threading
+import time as _time
 
 from collections import OrderedDict
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from flask import current_app
 from flask_login import LoginManager, UserMixin, current_user
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
 
 from synchronizer.connectors.base import ExportException
 from synchronizer.connectors.manager import ConnectorManager
@@ -28,6 +32,11 @@ def current_user_id_or_none():
         return None
 
 
+def escape_like(term):
+    """Escapes wildcards of LIKE pattern, so term is matched as is"""
+    return re.sub(r'([\\%_])', r'\\\1', term)
+
+
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
@@ -127,10 +136,47 @@ class Timezone(db.Model):
 
 class Worklog(db.Model):
     __tablename__ = 'worklogs'
+    # Default and max number of worklogs in page of API
+    PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    __table_args__ = (
+        # Every source worklog could be imported only once (when it is
+        # valid). Backs up search of already imported worklogs
+        db.Index(
+            'ix_worklogs_user_id_source_id',
+            'user_id', 'source_id',
+            unique=True,
+            postgresql_where=db.text('is_valid AND source_id IS NOT NULL'),
+            sqlite_where=db.text('is_valid AND source_id IS NOT NULL')
+        ),
+        # Top level worklogs of user (list of worklogs)
+        db.Index(
+            'ix_worklogs_user_id_date_started',
+            'user_id', 'date_started',
+            postgresql_where=db.text('parent_id IS NULL'),
+            sqlite_where=db.text('parent_id IS NULL')
+        ),
+        # Top level worklogs of synchronization (validation and export)
+        db.Index(
+            'ix_worklogs_synchronization_id_user_id_date_started',
+            'synchronization_id', 'user_id', 'date_started',
+            postgresql_where=db.text('parent_id IS NULL'),
+            sqlite_where=db.text('parent_id IS NULL')
+        ),
+        # All worklogs of synchronization (deletion)
+        db.Index('ix_worklogs_synchronization_id', 'synchronization_id'),
+        # Children of worklogs
+        db.Index(
+            'ix_worklogs_parent_id',
+            'parent_id',
+            postgresql_where=db.text('parent_id IS NOT NULL'),
+            sqlite_where=db.text('parent_id IS NOT NULL')
+        ),
+    )
     id = db.Column(db.Integer, primary_key=True)
     synchronization_id = db.Column(
         db.Integer,
-        db.ForeignKey('synchronizations.id'),
+        db.ForeignKey('synchronizations.id', ondelete='CASCADE'),
         nullable=False
     )
     date_started = db.Column(db.DateTime(timezone=True))
@@ -148,15 +194,18 @@ class Worklog(db.Model):
 
     parent_id = db.Column(
         db.Integer,
-        db.ForeignKey('worklogs.id'),
+        db.ForeignKey('worklogs.id', ondelete='CASCADE'),
         nullable=True
     )
 
     is_valid = db.Column(db.Boolean, default=True)
     user = db.relationship('User', backref='users')
+    # Children are deleted by database together with parent
     parent = db.relationship(
         'Worklog',
-        backref='children',
+        backref=db.backref(
+            'children', cascade='all,delete', passive_deletes=True
+        ),
         remote_side=[id]
     )
 
@@ -178,31 +227,203 @@ class Worklog(db.Model):
         """
         return self.id
 
+    def to_dict(self, tz=None):
+        """
+        Returns worklog as a dict for API, dates are converted to timezone
+        """
+        def iso(date):
+            if date is None:
+                return None
+            if date.tzinfo is None:
+                date = date.replace(tzinfo=timezone.utc)
+            return (date.astimezone(tz) if tz else date).isoformat()
+
+        return {
+            'id': self.id,
+            'synchronization_id': self.synchronization_id,
+            'date_started': iso(self.date_started),
+            'date_stopped': iso(self.date_stopped),
+            'duration': self.duration,
+            'comment': self.comment,
+            'issue_id': self.issue_id,
+            'is_valid': self.is_valid
+        }
+
+    @classmethod
+    def get_page(
+        cls, user_id, after=None, limit=None, descending=True,
+        date_from=None, date_to=None, issue_id=None, is_valid=None,
+        sync_id=None, connector_id=None
+    ):
+        """
+        Returns a page of top level worklogs ordered by (date_started, id)
+        and the key of the last one to request the next page with, or None
+        if it is the last page. Keyset pagination keeps deep pages as fast
+        as the first one
+        """
+        limit = min(limit or cls.PAGE_SIZE, cls.MAX_PAGE_SIZE)
+        query = cls.query.filter(
+            cls.user_id == user_id,
+            cls.parent_id == None  # NOQA
+        )
+        if date_from:
+            query = query.filter(cls.date_started >= date_from)
+        if date_to:
+            query = query.filter(cls.date_started < date_to)
+        if issue_id:
+            query = query.filter(cls.issue_id == issue_id)
+        if is_valid is not None:
+            query = query.filter(cls.is_valid == is_valid)
+        if sync_id:
+            query = query.filter(cls.synchronization_id == sync_id)
+        if connector_id:
+            # Filter by user lets synchronizations be found by index
+            query = query.join(Synchronization).filter(
+                Synchronization.user_id == user_id,
+                db.or_(
+                    Synchronization.source_id == connector_id,
+                    Synchronization.target_id == connector_id
+                )
+            )
+
+        if after:
+            date_started, worklog_id = after
+            if descending:
+                query = query.filter(db.or_(
+                    cls.date_started < date_started,
+                    db.and_(
+                        cls.date_started == date_started,
+                        cls.id < worklog_id
+                    )
+                ))
+            else:
+                query = query.filter(db.or_(
+                    cls.date_started > date_started,
+                    db.and_(
+                        cls.date_started == date_started,
+                        cls.id > worklog_id
+                    )
+                ))
+
+        if descending:
+            query = query.order_by(cls.date_started.desc(), cls.id.desc())
+        else:
+            query = query.order_by(cls.date_started, cls.id)
+
+        # One extra row tells if there is a next page
+        worklogs = query.limit(limit + 1).all()
+        if len(worklogs) > limit:
+            worklogs = worklogs[:limit]
+            last = worklogs[-1]
+            return worklogs, (last.date_started, last.id)
+        return worklogs, None
+
     @classmethod
     def delete(cls, worklog_id):
         """
-        Deletes worklog
+        Deletes worklog with its children
         """
         w = cls.query.get(worklog_id)
         if w and w.user_id == current_user.get_id():
-            db.session.delete(w)
+            if w.parent_id is None:
+                cls.forget_issue_usages(cls.id == w.id)
+            # Children are deleted explicitly, foreign keys are not
+            # enforced by every database
+            cls.query.filter(
+                db.or_(cls.id == w.id, cls.parent_id == w.id)
+            ).delete(synchronize_session=False)
             db.session.commit()
         return True
 
     @classmethod
     def delete_from_sync(cls, sync_id):
         """
-        Deletes all worklogs from synchronization
+        Deletes all worklogs from synchronization by one query without
+        loading them
         """
-        worklogs = cls.query.filter_by(synchronization_id=sync_id)
-        for w in worklogs:
-            db.session.delete(w)
+        cls.forget_issue_usages(cls.synchronization_id == sync_id)
+        cls.query.filter_by(synchronization_id=sync_id).delete(
+            synchronize_session=False
+        )
         db.session.commit()
 
     @classmethod
-    def create_all(cls, sync_id, raw_worklogs, connector_name):
+    def forget_issue_usages(cls, *criterion):
+        """
+        Removes uses of issues by top level worklogs matching criterion
+        from issue usages, before the worklogs are deleted. Worklogs are
+        not loaded, uses are counted by start dates of every issue, the
+        same dates are used when uses are added. Changes are not committed
+        """
+        rows = db.session.query(
+            cls.user_id, Synchronization.target_id, cls.issue_id,
+            cls.date_started, db.func.count(cls.id).label('count')
+        ).join(
+            Synchronization, cls.synchronization_id == Synchronization.id
+        ).filter(
+            cls.parent_id == None,  # NOQA
+            cls.issue_id != None,  # NOQA
+            *criterion
+        ).group_by(
+            cls.user_id, Synchronization.target_id, cls.issue_id,
+            cls.date_started
+        )
+
+        removed = {}
+        for row in rows:
+            removed.setdefault((row.user_id, row.target_id), []).extend(
+                [(row.issue_id, row.date_started)] * row.count
+            )
+        for (user_id, target_id), uses in removed.items():
+            IssueUsage.record(
+                user_id, target_id, removed=uses, with_commit=False
+            )
+
+    @classmethod
+    def create_all(cls, sync_id, raw_worklogs, connector_name, user=None):
+        """
+        Writes a new worklogs into database. Worklogs belong to the given
+        user or to current user of request
+        """
+        return cls.create_from_batches(
+            sync_id, [raw_worklogs], connector_name, user
+        )
+
+    @classmethod
+    def create_from_batches(cls, sync_id, batches, connector_name, user=None):
+        """
+        Writes worklogs yielded by batches (lists of worklog dicts) into
+        database. Every batch is grouped and saved in its own transaction
+        before the next one is read, only a short state of every saved
+        group is kept to continue groups in next batches
+        """
+        user = user or current_user
+        saved_groups = {}
+        target_id = db.session.query(Synchronization.target_id).filter_by(
+            id=sync_id
+        ).scalar()
+
+        for raw_worklogs in batches:
+            added_uses, removed_uses = cls.create_batch(
+                sync_id, raw_worklogs, connector_name, user, saved_groups
+            )
+            IssueUsage.record(
+                user.get_id(), target_id, added=added_uses,
+                removed=removed_uses, with_commit=False
+            )
+            db.session.commit()
+        return True
+
+    @classmethod
+    def create_batch(
+        cls, sync_id, raw_worklogs, connector_name, user, saved_groups
+    ):
         """
-        Writes a new worklogs into database
+        Inserts a batch of worklogs without committing. Worklogs of the
+        same date, issue and comment get a common parent. saved_groups is
+        a dict of groups saved by previous batches, it is updated with
+        groups of this batch. Returns lists of added and removed uses of
+        issues (issue ID, date started of top level worklog of group)
         """
         # Sort worklogs by date_started
         raw_worklogs.sort(key=lambda rw: rw['date_started'])
@@ -216,7 +437,8 @@ class Worklog(db.Model):
             # Strip to avoid issues with trailing spaces
             issue_id, comment = cls.parse_issue_id(
                 w['comment'].strip(),
-                connector_name
+                connector_name,
+                user
             )
 
             w['issue_id'] = issue_id
@@ -235,37 +457,83 @@ class Worklog(db.Model):
             else:
                 grouped_worklogs[w_hash] = [w]
 
+        # Leave only new worklogs, imported ones (including previous
+        # batches) are found with one query. Duplicates in raw worklogs are
+        # skipped too
+        existing_ids = cls.get_existing_source_ids(
+            [w['source_id'] for w in raw_worklogs],
+            user.get_id()
+        )
+        groups = []
         for w_hash, worklogs in grouped_worklogs.items():
-            # No parent by default
-            parent_id = None
-
-            # Leave only new worklogs
-            new_worklogs = [w for w in worklogs if not cls.is_exists(w)]
-
-            if len(new_worklogs) > 1:
-                # Create common parent
-                parent_worklog_data = {
-                    # We sorted worklogs by date_started so use first worklog
-                    # date_started and last worklog date_stopped
-                    'date_started': new_worklogs[0]['date_started'],
-                    'date_stopped': new_worklogs[-1]['date_stopped'],
-                    'issue_id': new_worklogs[0]['issue_id'],
-                    'comment': new_worklogs[0]['comment'],
-                    'is_valid': new_worklogs[0]['is_valid'],
-                    # TODO: What value should be used?
-                    'date_created': None,
-                    # Parent worklog doesn't have source_id!
-                    'source_id': None,
-                    'duration': sum([w['duration'] for w in new_worklogs]),
-                    'user_id': current_user.get_id(),
-                    'synchronization_id': sync_id
-                }
-
-                pw = Worklog(**parent_worklog_data)
-                db.session.add(pw)
-                db.session.commit()
-
-                parent_id = pw.id
+            new_worklogs = []
+            for w in worklogs:
+                if w['source_id'] not in existing_ids:
+                    existing_ids.add(w['source_id'])
+                    new_worklogs.append(w)
+            if new_worklogs:
+                groups.append((w_hash, new_worklogs))
+
+        # Create common parents for new groups of worklogs and for groups
+        # which single worklog was saved by previous batch at once, IDs are
+        # returned in the same order
+        new_parents = []
+        for w_hash, new_worklogs in groups:
+            saved = saved_groups.get(w_hash)
+            if saved is None and len(new_worklogs) > 1:
+                new_parents.append((w_hash, new_worklogs))
+            elif saved and not saved['parent_id']:
+                new_parents.append((w_hash, [saved] + new_worklogs))
+        parent_ids = dict(zip(
+            [w_hash for w_hash, _ in new_parents],
+            cls.bulk_insert([
+                cls.get_parent_data(worklogs, user.get_id(), sync_id)
+                for _, worklogs in new_parents
+            ], return_ids=True)
+        ))
+
+        worklogs_data = []
+        added_uses, removed_uses = [], []
+        for w_hash, new_worklogs in groups:
+            saved = saved_groups.get(w_hash)
+            group = ([saved] if saved else []) + new_worklogs
+            # New worklogs are sorted, the first one starts the group
+            if not saved:
+                added_uses.append((
+                    new_worklogs[0]['issue_id'],
+                    new_worklogs[0]['date_started']
+                ))
+            elif new_worklogs[0]['date_started'] < saved['date_started']:
+                # Group starts earlier, use is moved to its new start
+                removed_uses.append((saved['issue_id'], saved['date_started']))
+                added_uses.append((
+                    saved['issue_id'], new_worklogs[0]['date_started']
+                ))
+
+            if w_hash in parent_ids:
+                parent_id = parent_ids[w_hash]
+                if saved:
+                    # Worklog saved alone by previous batch becomes a child
+                    cls.query.filter_by(
+                        user_id=user.get_id(),
+                        synchronization_id=sync_id,
+                        source_id=saved['source_id'],
+                        parent_id=None
+                    ).update(
+                        {'parent_id': parent_id}, synchronize_session=False
+                    )
+            elif saved:
+                # Group has a parent already, update its totals
+                parent_id = saved['parent_id']
+                cls.query.filter_by(id=parent_id).update(
+                    cls.get_parent_data(group, user.get_id(), sync_id, (
+                        'date_started', 'date_stopped', 'duration'
+                    )),
+                    synchronize_session=False
+                )
+            else:
+                # No parent for a single worklog
+                parent_id = None
 
             for worklog in new_worklogs:
                 # Make a filtered copy of worklog dict to avoid errors with
@@ -279,15 +547,78 @@ class Worklog(db.Model):
                     'is_valid': worklog['is_valid'],
                     'source_id': worklog['source_id'],
                     'duration': worklog['duration'],
-                    'user_id': current_user.get_id(),
+                    'user_id': user.get_id(),
                     'synchronization_id': sync_id,
                     'parent_id': parent_id
                 }
-                w = Worklog(**worklog_data)
-                db.session.add(w)
-                db.session.commit()
+                worklogs_data.append(worklog_data)
+
+            # Remember top level worklog of group for next batches
+            saved_groups[w_hash] = dict(
+                cls.get_parent_data(group, user.get_id(), sync_id, (
+                    'date_started', 'date_stopped', 'duration', 'issue_id',
+                    'comment', 'is_valid'
+                )),
+                parent_id=parent_id,
+                source_id=None if parent_id else group[0]['source_id']
+            )
+        cls.bulk_insert(worklogs_data)
+        return added_uses, removed_uses
 
-        return True
+    @staticmethod
+    def get_parent_data(worklogs, user_id, sync_id, fields=None):
+        """
+        Returns data of parent worklog for group of worklogs (dicts),
+        optionally only the given fields
+        """
+        data = {
+            # Parent covers time of all worklogs of the group
+            'date_started': min(w['date_started'] for w in worklogs),
+            'date_stopped': max(w['date_stopped'] for w in worklogs),
+            'issue_id': worklogs[0]['issue_id'],
+            'comment': worklogs[0]['comment'],
+            'is_valid': worklogs[0]['is_valid'],
+            # TODO: What value should be used?
+            'date_created': None,
+            # Parent worklog doesn't have source_id!
+            'source_id': None,
+            'duration': sum([w['duration'] for w in worklogs]),
+            'user_id': user_id,
+            'synchronization_id': sync_id,
+            'parent_id': None
+        }
+        if fields:
+            return {k: data[k] for k in fields}
+        return data
+
+    @classmethod
+    def bulk_insert(cls, rows, return_ids=False, chunk_size=500):
+        """
+        Inserts rows (list of dicts with the same keys) using multi-row
+        INSERT statements without committing. Returns IDs of inserted rows
+        in the same order if return_ids is True
+        """
+        table = cls.__table__
+        ids = []
+
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            if not return_ids:
+                db.session.execute(table.insert().values(chunk))
+            elif db.engine.dialect.implicit_returning:
+                ids += [
+                    row[0] for row in db.session.execute(
+                        table.insert().values(chunk).returning(table.c.id)
+                    )
+                ]
+            else:
+                # No RETURNING support (SQLite), insert rows one by one
+                for row in chunk:
+                    ids.append(db.session.execute(
+                        table.insert().values(row)
+                    ).inserted_primary_key[0])
+
+        return ids
 
     @staticmethod
     def group(worklogs):
@@ -297,28 +628,51 @@ class Worklog(db.Model):
         pass
 
     @classmethod
-    def is_exists(cls, worklog):
+    def get_existing_source_ids(cls, source_ids, user_id, chunk_size=1000):
+        """
+        Returns set of source IDs of worklogs that already exist in DB
+        """
+        source_ids = list(set(source_ids))
+        existing_ids = set()
+
+        for start in range(0, len(source_ids), chunk_size):
+            existing_ids.update(
+                source_id for (source_id,) in db.session.query(
+                    cls.source_id
+                ).filter(
+                    cls.user_id == user_id,
+                    cls.source_id.in_(source_ids[start:start + chunk_size]),
+                    cls.is_valid
+                )
+            )
+
+        return existing_ids
+
+    def has_valid_duplicates(self):
         """
-        Checks if worklog already exists in DB
+        Checks if another valid worklog of user was imported from the same
+        source as the worklog or its children. Only one of them could be
+        valid
         """
-        # Search by source ID and check if valid
-        existing_worklog = cls.query.filter_by(
-            source_id=worklog['source_id'],
-            user_id=current_user.get_id(),
-            is_valid=True
-        ).first()
+        worklogs = [self] + list(self.children)
+        source_ids = [w.source_id for w in worklogs if w.source_id]
+        if not source_ids:
+            return False
 
-        if existing_worklog:
-            # Uncomment code below to additionally check by duration
-            # If duration the same - exists
-            # if worklog['duration'] == existing_worklog.duration:
-            #     return True
-            return True
-        return False
+        with db.session.no_autoflush:
+            return db.session.query(
+                Worklog.query.filter(
+                    Worklog.user_id == self.user_id,
+                    Worklog.source_id.in_(source_ids),
+                    Worklog.is_valid,
+                    Worklog.id.notin_([w.id for w in worklogs])
+                ).exists()
+            ).scalar()
 
     @staticmethod
-    def parse_issue_id(comment, connector_name):
-        descr_regex = re.compile(current_user.issue_id_pattern)
+    def parse_issue_id(comment, connector_name, user=None):
+        user = user or current_user
+        descr_regex = re.compile(user.issue_id_pattern)
         res = descr_regex.search(comment)
 
         if res and res.group('issue_id'):
@@ -330,8 +684,8 @@ class Worklog(db.Model):
                 res.group('cn').lower() == connector_name.lower()
             ) or (
                 not res.group('cn') and
-                current_user.default_target and
-                current_user.default_target.connector_type.name.lower() ==
+                user.default_target and
+                user.default_target.connector_type.name.lower() ==
                     connector_name.lower()
             ):
                 return (
@@ -381,7 +735,8 @@ class Connector(db.Model):
     user_id = db.Column(
         db.Integer,
         db.ForeignKey('users.id'),
-        nullable=False
+        nullable=False,
+        index=True
     )
     date_created = db.Column(
         db.DateTime(timezone=True),
@@ -432,6 +787,38 @@ class Connector(db.Model):
     def __repr__(self):
         return self.name
 
+    @property
+    def fingerprint(self):
+        """
+        Returns hash of type, server and credentials of connector. Encrypted
+        values are used, so nothing is decrypted to calculate it
+        """
+        return hashlib.sha256('\n'.join([
+            str(self.connector_type_id),
+            self.server or '',
+            self.login or '',
+            self._password or '',
+            self._api_token or ''
+        ]).encode()).hexdigest()
+
+    def create_connector(self, progress_callback=None):
+        """
+        Returns connector instance. Instances are pooled per process, so
+        credentials are decrypted and authentication is made only when
+        connector is used first time or changed
+        """
+        return ConnectorManager.get_pooled_connector(
+            self.id,
+            self.fingerprint,
+            lambda: (self.connector_type.name, {
+                'server': self.server,
+                'api_token': self.api_token,
+                'login': self.login,
+                'password': self.password
+            }),
+            progress_callback=progress_callback
+        )
+
     @classmethod
     def create(cls, with_commit=True, **kwargs):
         """
@@ -455,6 +842,7 @@ class Connector(db.Model):
         if c and c.user_id == current_user.get_id():
             db.session.delete(c)
             db.session.commit()
+            ConnectorManager.invalidate(connector_id)
         return True
 
     def update(self, form=None, **kwargs):
@@ -468,22 +856,337 @@ class Connector(db.Model):
                 setattr(self, k, v)
 
         db.session.commit()
+        ConnectorManager.invalidate(self.id)
         return True
 
 
+class Issue(db.Model):
+    """
+    Cache of issues of target servers. It is shared between all
+    synchronizations and users of the same target server
+    """
+    __tablename__ = 'issues'
+    __table_args__ = (
+        db.UniqueConstraint('connector_type_id', 'server', 'issue_id'),
+    )
+
+    # How long existing and not existing issues are trusted
+    EXISTS_TTL = timedelta(days=1)
+    NOT_EXISTS_TTL = timedelta(hours=1)
+
+    id = db.Column(db.Integer, primary_key=True)
+    connector_type_id = db.Column(
+        db.Integer,
+        db.ForeignKey('connector_types.id'),
+        nullable=False
+    )
+    server = db.Column(db.String(128), nullable=False, default="")
+    issue_id = db.Column(db.String(128), nullable=False)
+    summary = db.Column(db.String(2000))
+    is_exists = db.Column(db.Boolean, nullable=False)
+    date_checked = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return '<Issue %r>' % (self.issue_id)
+
+    @classmethod
+    def is_fresh(cls):
+        """
+        Returns SQL condition to filter not expired issues
+        """
+        now = DateAndTime().now()
+        return db.or_(
+            db.and_(cls.is_exists, cls.date_checked >= now - cls.EXISTS_TTL),
+            db.and_(
+                db.not_(cls.is_exists),
+                cls.date_checked >= now - cls.NOT_EXISTS_TTL
+            )
+        )
+
+    @classmethod
+    def get_fresh(cls, connector, issue_ids):
+        """
+        Returns not expired cached issues of target connector as a dict
+        {issue_id: Issue}
+        """
+        issue_ids = set(i for i in issue_ids if i)
+        if not issue_ids:
+            return {}
+
+        issues = cls.query.filter(
+            cls.connector_type_id == connector.connector_type_id,
+            cls.server == connector.server,
+            cls.issue_id.in_(issue_ids),
+            cls.is_fresh()
+        )
+        return {i.issue_id: i for i in issues}
+
+    @classmethod
+    def store(cls, connector, issues):
+        """
+        Saves checked issues of target connector. Issues should be a dict
+        {issue_id: (is_exists, summary)}. Issues are upserted, so
+        concurrent requests could save the same issues
+        """
+        issues = {k: v for k, v in issues.items() if k}
+        if not issues:
+            return
+
+        now = DateAndTime().now()
+        dialect = db.engine.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = (
+                postgresql.insert if dialect == 'postgresql'
+                else sqlite.insert
+            )(cls.__table__).values([
+                {
+                    'connector_type_id': connector.connector_type_id,
+                    'server': connector.server,
+                    'issue_id': issue_id,
+                    'is_exists': is_exists,
+                    'summary': summary,
+                    'date_checked': now
+                }
+                # Rows are locked in the same order by all requests
+                for issue_id, (is_exists, summary) in sorted(issues.items())
+            ])
+            db.session.execute(insert.on_conflict_do_update(
+                index_elements=['connector_type_id', 'server', 'issue_id'],
+                set_={
+                    'is_exists': insert.excluded.is_exists,
+                    'date_checked': insert.excluded.date_checked,
+                    'summary': db.func.coalesce(
+                        insert.excluded.summary, cls.__table__.c.summary
+                    )
+                }
+            ))
+            db.session.commit()
+            return
+
+        existing = cls.query.filter(
+            cls.connector_type_id == connector.connector_type_id,
+            cls.server == connector.server,
+            cls.issue_id.in_(issues.keys())
+        )
+        existing = {i.issue_id: i for i in existing}
+
+        for issue_id, (is_exists, summary) in issues.items():
+            issue = existing.get(issue_id)
+            if not issue:
+                issue = cls(
+                    connector_type_id=connector.connector_type_id,
+                    server=connector.server,
+                    issue_id=issue_id
+                )
+                db.session.add(issue)
+            issue.is_exists = is_exists
+            issue.date_checked = now
+            if summary is not None:
+                issue.summary = summary
+
+        db.session.commit()
+
+    @classmethod
+    def validate(cls, connector, target_connector, issue_ids):
+        """
+        Returns set of existing issues. Only issues missed in cache
+        are checked in target source
+        """
+        issue_ids = set(i for i in issue_ids if i)
+        cached = cls.get_fresh(connector, issue_ids)
+
+        not_cached_ids = issue_ids - set(cached.keys())
+        checked_ids = set()
+        if not_cached_ids:
+            checked_ids = target_connector.validate_issues(not_cached_ids)
+            cls.store(connector, {
+                i: (i in checked_ids, None) for i in not_cached_ids
+            })
+
+        return checked_ids | set(
+            i.issue_id for i in cached.values() if i.is_exists
+        )
+
+    @classmethod
+    def search(cls, connector, term, limit=10):
+        """
+        Returns cached existing issues with ID or summary matching the term
+        """
+        term = escape_like(term)
+        issues = cls.query.filter(
+            cls.connector_type_id == connector.connector_type_id,
+            cls.server == connector.server,
+            cls.is_exists,
+            cls.is_fresh(),
+            db.or_(
+                cls.issue_id.ilike('{}%'.format(term), escape='\\'),
+                cls.summary.ilike('%{}%'.format(term), escape='\\')
+            )
+        ).order_by(cls.issue_id).limit(limit)
+        return [{'id': i.issue_id, 'name': i.summary or ''} for i in issues]
+
+
+class IssueUsage(db.Model):
+    """
+    Issues used by user in worklogs of target connector. It is updated when
+    worklogs are imported or edited and gives suggestions of issue IDs
+    without requests to target
+    """
+    __tablename__ = 'issue_usages'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'connector_id', 'issue_id'),
+    )
+
+    # Max number of suggestions. Target isn't searched if there are enough
+    SUGGESTIONS_LIMIT = 10
+    # Rank is a sum of 2 ** (age / RANK_HALF_LIFE) of all uses counted from
+    # RANK_EPOCH. Comparing ranks is comparing frequencies where every use
+    # weighs twice less than a use made RANK_HALF_LIFE later
+    RANK_HALF_LIFE = timedelta(
+        days=int(os.environ.get('ISSUE_USAGE_HALF_LIFE_DAYS', 30))
+    )
+    RANK_EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey('users.id'),
+        nullable=False
+    )
+    connector_id = db.Column(
+        db.Integer,
+        db.ForeignKey('connectors.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    issue_id = db.Column(db.String(128), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    rank = db.Column(db.Float, nullable=False, default=0)
+    date_last_used = db.Column(db.DateTime(timezone=True))
+
+    def __repr__(self):
+        return '<IssueUsage %r>' % (self.issue_id)
+
+    @staticmethod
+    def as_utc(date):
+        """
+        Returns aware date, naive dates (SQLite) are in UTC
+        """
+        if date.tzinfo is None:
+            return date.replace(tzinfo=timezone.utc)
+        return date
+
+    @classmethod
+    def get_rank(cls, date_used):
+        """
+        Returns rank of one use of issue at date_used
+        """
+        return 2 ** min(
+            (cls.as_utc(date_used) - cls.RANK_EPOCH) / cls.RANK_HALF_LIFE,
+            1000
+        )
+
+    @classmethod
+    def record(
+        cls, user_id, connector_id, added=(), removed=(), with_commit=True
+    ):
+        """
+        Counts uses of issues. Added and removed are lists of tuples
+        (issue ID, date of use)
+        """
+        changes = {}
+        for sign, uses in ((1, added), (-1, removed)):
+            for issue_id, date_used in uses:
+                if issue_id and date_used:
+                    changes.setdefault(issue_id, []).append((sign, date_used))
+        if not changes:
+            return
+
+        existing = cls.query.filter(
+            cls.user_id == user_id,
+            cls.connector_id == connector_id,
+            cls.issue_id.in_(changes.keys())
+        )
+        existing = {u.issue_id: u for u in existing}
+
+        for issue_id, uses in changes.items():
+            usage = existing.get(issue_id)
+            if not usage:
+                usage = cls(
+                    user_id=user_id,
+                    connector_id=connector_id,
+                    issue_id=issue_id,
+                    count=0,
+                    rank=0
+                )
+                db.session.add(usage)
+
+            for sign, date_used in uses:
+                usage.count += sign
+                usage.rank = max(
+                    usage.rank + sign * cls.get_rank(date_used), 0
+                )
+                if sign > 0 and (
+                    usage.date_last_used is None
+                    or cls.as_utc(usage.date_last_used)
+                    < cls.as_utc(date_used)
+                ):
+                    usage.date_last_used = date_used
+
+            if usage.count <= 0:
+                if usage.id:
+                    db.session.delete(usage)
+                else:
+                    db.session.expunge(usage)
+
+        if with_commit:
+            db.session.commit()
+
+    @classmethod
+    def suggest(cls, user_id, connector, term, limit=None):
+        """
+        Returns issues used by user in target connector with ID starting
+        with the term or with summary containing it, most frequently and
+        recently used first. Issues known as not existing are skipped
+        """
+        term = escape_like(term)
+        rows = db.session.query(cls.issue_id, Issue.summary).outerjoin(
+            Issue,
+            db.and_(
+                Issue.connector_type_id == connector.connector_type_id,
+                Issue.server == connector.server,
+                Issue.issue_id == cls.issue_id
+            )
+        ).filter(
+            cls.user_id == user_id,
+            cls.connector_id == connector.id,
+            db.or_(Issue.id == None, Issue.is_exists),  # NOQA
+            db.or_(
+                cls.issue_id.ilike('{}%'.format(term), escape='\\'),
+                Issue.summary.ilike('%{}%'.format(term), escape='\\')
+            )
+        ).order_by(cls.rank.desc()).limit(limit or cls.SUGGESTIONS_LIMIT)
+        return [{'id': r.issue_id, 'name': r.summary or ''} for r in rows]
+
+
 class Synchronization(db.Model):
     __tablename__ = 'synchronizations'
+    __table_args__ = (
+        db.Index(
+            'ix_synchronizations_user_id_date_created',
+            'user_id', 'date_created'
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
     source_id = db.Column(
         db.Integer,
-        db.ForeignKey('connectors.id'),
+        db.ForeignKey('connectors.id', ondelete='CASCADE'),
         nullable=False
     )
     target_id = db.Column(
         db.Integer,
-        db.ForeignKey('connectors.id'),
+        db.ForeignKey('connectors.id', ondelete='CASCADE'),
         nullable=False
     )
     date_started_from = db.Column(db.DateTime, nullable=False)
@@ -501,20 +1204,27 @@ class Synchronization(db.Model):
 
     source = db.relationship(
         'Connector',
-        backref=db.backref('source_syncs', cascade="all,delete"),
+        backref=db.backref(
+            'source_syncs', cascade="all,delete", passive_deletes=True
+        ),
         foreign_keys=[source_id]
     )
 
     target = db.relationship(
         'Connector',
-        backref=db.backref('target_syncs', cascade="all,delete"),
+        backref=db.backref(
+            'target_syncs', cascade="all,delete", passive_deletes=True
+        ),
         foreign_keys=[target_id]
     )
 
+    # Rows of related objects are deleted by database (ON DELETE CASCADE)
+    # instead of loading them into session
     worklogs = db.relationship(
         'Worklog',
         backref='synchronization',
-        cascade="all,delete"
+        cascade="all,delete",
+        passive_deletes=True
     )
 
     user = db.relationship('User', backref='synchronizations')
@@ -542,75 +1252,198 @@ class Synchronization(db.Model):
         """
         s = cls.query.get(sync_id)
         if s and s.user_id == current_user.get_id():
+            # Worklogs are deleted explicitly with one query too, for
+            # databases that don't enforce foreign keys
+            Worklog.forget_issue_usages(Worklog.synchronization_id == s.id)
+            Worklog.query.filter_by(synchronization_id=s.id).delete(
+                synchronize_session=False
+            )
             db.session.delete(s)
             db.session.commit()
         return True
 
-    def validate_worklogs(self):
+    def get_worklogs(self, user_id):
+        """
+        Returns top level worklogs of synchronization ordered by start date.
+        Children of all worklogs are loaded by one more query
+        """
+        return Worklog.query.options(
+            db.selectinload(Worklog.children)
+        ).filter_by(
+            synchronization_id=self.get_id(),
+            user_id=user_id,
+            parent_id=None
+        ).order_by(Worklog.date_started).all()
+
+    @classmethod
+    def get_totals(cls, sync_ids, user_id):
+        """
+        Returns totals of top level worklogs of synchronizations calculated
+        by one SQL query as a dict {sync_id: totals}
+        """
+        totals = {
+            sync_id: cls.empty_totals() for sync_id in sync_ids
+        }
+        if not totals:
+            return totals
+
+        rows = cls.totals_query(user_id).add_columns(
+            Worklog.synchronization_id
+        ).filter(
+            Worklog.synchronization_id.in_(totals.keys())
+        ).group_by(Worklog.synchronization_id)
+
+        for row in rows:
+            totals[row.synchronization_id] = cls.row_to_totals(row)
+        return totals
+
+    def get_total(self, user_id):
+        """
+        Returns totals of synchronization calculated by SQL aggregate
+        """
+        return self.row_to_totals(
+            self.totals_query(user_id).filter(
+                Worklog.synchronization_id == self.get_id()
+            ).one()
+        )
+
+    def get_summary(self, user_id):
+        """
+        Returns totals of synchronization in whole, per day and per issue
+        """
+        query = self.totals_query(user_id).filter(
+            Worklog.synchronization_id == self.get_id()
+        )
+        day = db.func.date(Worklog.date_started).label('day')
+
+        return {
+            'totals': self.get_total(user_id),
+            'days': [
+                dict(self.row_to_totals(row), day=str(row.day))
+                for row in query.add_columns(day)
+                .group_by(day).order_by(day)
+            ],
+            'issues': [
+                dict(self.row_to_totals(row), issue_id=row.issue_id)
+                for row in query.add_columns(Worklog.issue_id)
+                .group_by(Worklog.issue_id)
+                .order_by(Worklog.issue_id.nullslast())
+            ]
+        }
+
+    @staticmethod
+    def totals_query(user_id):
+        """
+        Returns query of aggregates of top level worklogs. Worklogs with
+        unknown state are counted as skipped like in templates
+        """
+        is_valid = Worklog.is_valid == True  # NOQA
+        return db.session.query(
+            db.func.count(Worklog.id).label('count'),
+            db.func.sum(
+                db.case([(is_valid, 1)], else_=0)
+            ).label('synchronized_count'),
+            db.func.sum(
+                db.case([(is_valid, Worklog.duration)], else_=0)
+            ).label('synchronized'),
+            db.func.sum(
+                db.case([(is_valid, 0)], else_=Worklog.duration)
+            ).label('skipped')
+        ).filter(
+            Worklog.user_id == user_id,
+            Worklog.parent_id == None  # NOQA
+        )
+
+    @staticmethod
+    def empty_totals():
+        return {
+            'count': 0,
+            'synchronized_count': 0,
+            'skipped_count': 0,
+            'synchronized': 0,
+            'skipped': 0
+        }
+
+    @staticmethod
+    def row_to_totals(row):
+        """
+        Converts row of totals query to a dict, sums are None without rows
+        """
+        return {
+            'count': row.count,
+            'synchronized_count': row.synchronized_count or 0,
+            'skipped_count': row.count - (row.synchronized_count or 0),
+            'synchronized': row.synchronized or 0,
+            'skipped': row.skipped or 0
+        }
+
+    @classmethod
+    def get_with_target(cls, sync_id):
+        """
+        Returns synchronization with target connector and its type
+        """
+        return cls.query.options(
+            db.joinedload(cls.target).joinedload(Connector.connector_type)
+        ).get(sync_id)
+
+    def validate_worklogs(self, progress_callback=None):
         worklogs = self.worklogs
         target_name = self.target.connector_type.name
 
-        target_connector = ConnectorManager.create_connector(
-            target_name,
-            server=self.target.server,
-            api_token=self.target.api_token,
-            login=self.target.login,
-            password=self.target.password
-        )
+        target_connector = self.target.create_connector(progress_callback)
         
+        # Check every issue only once, cached issues are not checked at all
+        existing_issue_ids = Issue.validate(
+            self.target,
+            target_connector,
+            [w.issue_id for w in worklogs if w.is_valid]
+        )
+
         for w in worklogs:
             if w.is_valid:
-                if not target_connector.validate_issue(w.issue_id):
+                if w.issue_id not in existing_issue_ids:
                     w.is_valid = False
                     current_app.logger.warning(f'Wrong issue id {w.issue_id} in {target_name}.')
 
         db.session.commit()
 
-    def import_worklogs(self):
+    def import_worklogs(self, progress_callback=None):
         """
-        Imports worklogs from source
+        Imports worklogs from source. Progress of connector is reported to
+        optional progress_callback
         """
-        source_name = self.source.connector_type.name
         target_name = self.target.connector_type.name
 
-        source_connector = ConnectorManager.create_connector(
-            source_name,
-            server=self.source.server,
-            api_token=self.source.api_token,
-            login=self.source.login,
-            password=self.source.password
-        )
+        source_connector = self.source.create_connector(progress_callback)
 
-        imported_worklogs = source_connector.import_worklogs(
+        # Synchronization could be run by worker outside of request so
+        # settings are taken from its user instead of current user
+        # Worklogs are saved by batches while connector imports them
+        imported_batches = source_connector.iter_worklogs(
             DateAndTime(
-                current_user.timezone.name
+                self.user.timezone.name
             ).localize(
                 self.date_started_from
             ).isoformat('T'),
             (
                 # Added 1 day due to limitation of new Toggl API
-                DateAndTime(current_user.timezone.name).now() + timedelta(days=1)
+                DateAndTime(self.user.timezone.name).now() + timedelta(days=1)
             ).isoformat('T')
         )
 
-        Worklog.create_all(
+        Worklog.create_from_batches(
             self.get_id(),
-            imported_worklogs,
-            target_name  # type of connector to parse task/issue ID
+            imported_batches,
+            target_name,  # type of connector to parse task/issue ID
+            self.user
         )
 
-    def export_worklogs(self):
+    def export_worklogs(self, progress_callback=None):
         """
-        Exports worklogs to target resource
+        Exports worklogs to target resource. Progress of connector is
+        reported to optional progress_callback
         """
-        target_name = self.target.connector_type.name
-        target_connector = ConnectorManager.create_connector(
-            target_name,
-            server=self.target.server,
-            api_token=self.target.api_token,
-            login=self.target.login,
-            password=self.target.password
-        )
+        target_connector = self.target.create_connector(progress_callback)
 
         # Get all valid worklogs from this synchronization
         worklogs_to_upload = Worklog.query \
@@ -618,21 +1451,64 @@ class Synchronization(db.Model):
                 Worklog.synchronization_id == self.get_id(),
                 Worklog.is_valid,
                 Worklog.parent_id == None  # NOQA
-            )
+            ) \
+            .order_by(Worklog.date_started, Worklog.id)
+
+        # Don't export worklogs with issues known as not existing in target
+        issue_ids = set(w.issue_id for w in worklogs_to_upload)
+        cached_issues = Issue.get_fresh(self.target, issue_ids)
+        for w in worklogs_to_upload:
+            issue = cached_issues.get(w.issue_id)
+            if issue and not issue.is_exists:
+                w.is_valid = False
+        db.session.commit()
+
+        # Connector gets a list, so indexes of errors point to the same
+        # worklogs here. IDs are taken before connector commits anything
+        worklogs_to_upload = worklogs_to_upload.all()
+        uploaded_ids = [w.id for w in worklogs_to_upload]
 
         try:
             target_connector.export_worklogs(worklogs_to_upload)
         except ExportException as err:
             # just delete worklogs
             # TODO: implement better solution
-            worklogs_to_delete = worklogs_to_upload[err.index:]
-            for w in worklogs_to_delete:
-                Worklog.delete(w.get_id())
+            if err.indexes is None:
+                worklog_ids = uploaded_ids[err.index:]
+            else:
+                worklog_ids = [uploaded_ids[i] for i in err.indexes]
+            if worklog_ids:
+                Worklog.forget_issue_usages(Worklog.id.in_(worklog_ids))
+                # Children are deleted explicitly, foreign keys are not
+                # enforced by every database
+                Worklog.query.filter(db.or_(
+                    Worklog.id.in_(worklog_ids),
+                    Worklog.parent_id.in_(worklog_ids)
+                )).delete(synchronize_session=False)
             db.session.commit()
             raise err
 
-        current_user.update(date_last_sync=datetime.utcnow())
-        self.complete()
+        # Remember issues checked by export: connector marks worklogs with
+        # wrong issue IDs as invalid
+        not_existing_ids = set(
+            w.issue_id for w in Worklog.query.filter(
+                Worklog.synchronization_id == self.get_id(),
+                Worklog.issue_id.in_(issue_ids),
+                Worklog.is_valid == False,  # NOQA
+                Worklog.parent_id == None  # NOQA
+            )
+        ) if issue_ids else set()
+        Issue.store(self.target, {
+            i: (i not in not_existing_ids, None)
+            for i in issue_ids
+            if i not in cached_issues or (
+                cached_issues[i].is_exists and i in not_existing_ids
+            )
+        })
+
+        self.user.update(date_last_sync=datetime.utcnow())
+        self.is_completed = True
+        db.session.commit()
 
     def is_active(self):
         """
@@ -663,3 +1539,309 @@ class Synchronization(db.Model):
         self.is_completed = True
         db.session.commit()
         return True
+
+
+class Job(db.Model):
+    """
+    Background job of synchronization. Jobs are queued in database and run
+    by a worker (`flask worker`) outside of web requests
+    """
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_state_date_created', 'state', 'date_created'),
+    )
+
+    ACTION_IMPORT = 'import'  # import and validate worklogs
+    ACTION_EXPORT = 'export'
+
+    STATE_PENDING = 'pending'
+    STATE_RUNNING = 'running'
+    STATE_DONE = 'done'
+    STATE_FAILED = 'failed'
+
+    # Running job is taken again if its worker didn't report for TIMEOUT
+    # (the worker died), running worker reports every HEARTBEAT_INTERVAL
+    TIMEOUT = timedelta(seconds=int(os.environ.get('JOB_TIMEOUT', 300)))
+    HEARTBEAT_INTERVAL = float(os.environ.get('JOB_HEARTBEAT_INTERVAL', 30))
+    # Minimal number of seconds between saves of connector progress
+    PROGRESS_INTERVAL = float(os.environ.get('JOB_PROGRESS_INTERVAL', 1))
+
+    id = db.Column(db.Integer, primary_key=True)
+    synchronization_id = db.Column(
+        db.Integer,
+        db.ForeignKey('synchronizations.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True
+    )
+    action = db.Column(db.String(32), nullable=False)
+    state = db.Column(db.String(32), nullable=False, default=STATE_PENDING)
+    # Human readable step and its progress in percents
+    phase = db.Column(db.String(128))
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    # Progress of current phase reported by connector
+    items_done = db.Column(db.Integer, nullable=False, default=0)
+    items_total = db.Column(db.Integer)
+    requests_count = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String(2000))
+    worker = db.Column(db.String(128))
+    date_created = db.Column(
+        db.DateTime(timezone=True),
+        default=datetime.utcnow
+    )
+    date_started = db.Column(db.DateTime(timezone=True))
+    date_heartbeat = db.Column(db.DateTime(timezone=True))
+    date_finished = db.Column(db.DateTime(timezone=True))
+
+    synchronization = db.relationship(
+        'Synchronization',
+        backref=db.backref('jobs', cascade="all,delete", passive_deletes=True)
+    )
+
+    def __repr__(self):
+        return '<Job %r %r>' % (self.action, self.state)
+
+    def get_id(self):
+        """
+        Returns job ID
+        """
+        return self.id
+
+    @staticmethod
+    def create(**kwargs):
+        """
+        Returns new pending job
+        """
+        j = Job(**kwargs)
+        db.session.add(j)
+        db.session.commit()
+        return j
+
+    def update(self, **kwargs):
+        """
+        Updates job
+        """
+        for k, v in kwargs.items():
+            setattr(self, k, v)
+        db.session.commit()
+        return True
+
+    def is_active(self):
+        """
+        Returns True if job is not finished yet
+        """
+        return self.state in (self.STATE_PENDING, self.STATE_RUNNING)
+
+    @classmethod
+    def get_active(cls, sync_id):
+        """
+        Returns not finished job of synchronization if any
+        """
+        return cls.query.filter(
+            cls.synchronization_id == sync_id,
+            cls.state.in_((cls.STATE_PENDING, cls.STATE_RUNNING))
+        ).order_by(cls.id.desc()).first()
+
+    @classmethod
+    def get_last(cls, sync_id):
+        """
+        Returns the last job of synchronization
+        """
+        return cls.query.filter_by(
+            synchronization_id=sync_id
+        ).order_by(cls.id.desc()).first()
+
+    @classmethod
+    def claim(cls, worker):
+        """
+        Takes the oldest pending job for worker or a running job of worker
+        without heartbeat. Rows locked by other workers are skipped on
+        Postgres, conditional update makes sure that the job is taken only
+        once on other databases too
+        """
+        now = datetime.utcnow()
+        candidate = db.session.query(
+            cls.id, cls.state, cls.date_heartbeat
+        ).filter(db.or_(
+            cls.state == cls.STATE_PENDING,
+            db.and_(
+                cls.state == cls.STATE_RUNNING,
+                cls.date_heartbeat < now - cls.TIMEOUT
+            )
+        )).order_by(
+            cls.date_created, cls.id
+        ).with_for_update(skip_locked=True).first()
+
+        if not candidate:
+            db.session.commit()
+            return None
+
+        claimed = cls.query.filter(
+            cls.id == candidate.id,
+            cls.state == candidate.state,
+            # Compared with IS NULL for pending jobs
+            cls.date_heartbeat == candidate.date_heartbeat
+        ).update({
+            'state': cls.STATE_RUNNING,
+            'worker': worker,
+            'date_started': now,
+            'date_heartbeat': now,
+            'progress': 0
+        }, synchronize_session=False)
+        db.session.commit()
+
+        return cls.query.get(candidate.id) if claimed else None
+
+    def run(self):
+        """
+        Runs steps of synchronization and saves state of job. Returns True
+        if job is done successfully
+        """
+        sync = self.synchronization
+        if not sync:
+            self.update(
+                state=self.STATE_FAILED,
+                error='Synchronization is deleted',
+                date_finished=datetime.utcnow()
+            )
+            return False
+
+        job_id, sync_id, action = self.id, sync.get_id(), self.action
+        heartbeat = self.start_heartbeat()
+        try:
+            if action == self.ACTION_IMPORT:
+                self.update(phase='Importing worklogs', progress=0)
+                sync.import_worklogs(self.get_progress_callback(0, 50))
+                self.update(
+                    phase='Validating worklogs', progress=50,
+                    items_done=0, items_total=None
+                )
+                sync.validate_worklogs(self.get_progress_callback(50, 100))
+            elif action == self.ACTION_EXPORT:
+                self.update(phase='Exporting worklogs', progress=0)
+                sync.export_worklogs(self.get_progress_callback(0, 100))
+            else:
+                raise ValueError('Unknown job action {}'.format(action))
+        except Exception as err:
+            print(err)
+            db.session.rollback()
+            # Synchronization and its jobs could be deleted meanwhile
+            sync = Synchronization.query.get(sync_id)
+            if sync and action == self.ACTION_IMPORT:
+                # Don't leave partially imported synchronization active
+                Worklog.delete_from_sync(sync_id)
+                sync.is_cancelled = True
+                db.session.commit()
+            self.finish(
+                job_id,
+                state=self.STATE_FAILED,
+                error=(getattr(err, 'message', None) or str(err))[:2000],
+                date_finished=datetime.utcnow()
+            )
+            return False
+        finally:
+            heartbeat.set()
+
+        return self.finish(
+            job_id,
+            state=self.STATE_DONE,
+            progress=100,
+            date_finished=datetime.utcnow()
+        )
+
+    @classmethod
+    def finish(cls, job_id, **kwargs):
+        """
+        Saves final state of job. Returns False if job is deleted
+        """
+        job = cls.query.get(job_id)
+        if not job:
+            print('Job {} is deleted'.format(job_id))
+            return False
+        return job.update(**kwargs)
+
+    def start_heartbeat(self):
+        """
+        Starts thread saving heartbeat of job every HEARTBEAT_INTERVAL by
+        its own connection, so long steps without progress are not taken
+        by other workers. Returns event stopping the thread
+        """
+        engine = db.engine
+        table = self.__table__
+        job_id = self.id
+        stopped = threading.Event()
+
+        def beat():
+            while not stopped.wait(self.HEARTBEAT_INTERVAL):
+                try:
+                    with engine.begin() as connection:
+                        connection.execute(
+                            table.update().where(
+                                table.c.id == job_id
+                            ).values(date_heartbeat=datetime.utcnow())
+                        )
+                except Exception as err:
+                    print(err)
+
+        threading.Thread(target=beat, daemon=True).start()
+        return stopped
+
+    def get_progress_callback(self, start, end):
+        """
+        Returns callback for connector progress. Progress of phase is
+        scaled to [start, end] percents of job. Connectors call it from
+        many threads, so it is saved by its own connection and not more
+        often than PROGRESS_INTERVAL (except the last item of phase)
+        """
+        engine = db.engine
+        table = self.__table__
+        job_id = self.id
+        interval = self.PROGRESS_INTERVAL
+        lock = threading.Lock()
+        last_saved = [0]
+
+        def callback(progress):
+            done, total = progress['done'], progress['total']
+            is_finished = bool(total) and done >= total
+            with lock:
+                now = _time.time()
+                if now - last_saved[0] < interval and not is_finished:
+                    return
+                last_saved[0] = now
+
+                percent = start
+                if total:
+                    percent += (end - start) * min(done, total) // total
+                values = {
+                    'progress': percent,
+                    'items_done': done,
+                    'items_total': total,
+                    'requests_count': progress['requests'],
+                    'date_heartbeat': datetime.utcnow()
+                }
+                if progress['phase']:
+                    values['phase'] = progress['phase']
+                with engine.begin() as connection:
+                    connection.execute(
+                        table.update().where(
+                            table.c.id == job_id
+                        ).values(**values)
+                    )
+
+        return callback
+
+    def to_dict(self):
+        """
+        Returns job state as a dict for API
+        """
+        return {
+            'id': self.id,
+            'synchronization_id': self.synchronization_id,
+            'action': self.action,
+            'state': self.state,
+            'phase': self.phase,
+            'progress': self.progress,
+            'items_done': self.items_done,
+            'items_total': self.items_total,
+            'requests_count': self.requests_count,
+            'error': self.error
+        }
@@ -24,7 +24,8 @@ $(function () {
   });
 
   $(document).ready(function () {
-    $('table').DataTable({
+    // Tables loaded by pages from API are not sorted on client side
+    $('table').not('[data-url]').DataTable({
       columnDefs: [
         { type: 'natural', targets: '_all' }
       ]
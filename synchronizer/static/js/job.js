@@ -0,0 +1,85 @@
+class Job {
+  constructor(el) {
+    this.el = el;
+    this.phase_el = document.getElementById('job-phase');
+    this.details_el = document.getElementById('job-details');
+    this.progress_el = document.getElementById('job-progress');
+    this.bar_el = document.getElementById('job-progress-bar');
+    this.error_el = document.getElementById('job-error');
+    this.error_details_el = document.getElementById('job-error-details');
+
+    if (window.EventSource) {
+      this.listen();
+    } else {
+      this.poll();
+    }
+  }
+
+  // Progress is pushed by server while job is running
+  listen() {
+    let source = new EventSource(this.el.dataset.streamUrl);
+    source.onmessage = function (e) {
+      let job = JSON.parse(e.data);
+      if (!job || String(job.id) !== this.el.dataset.id) {
+        // Another job of synchronization was started, check own one
+        source.close();
+        return this.poll();
+      }
+      if (this.render(job)) {
+        source.close();
+      }
+    }.bind(this);
+  }
+
+  poll() {
+    let xhr = new XMLHttpRequest();
+    xhr.responseType = 'json';
+    xhr.open('GET', this.el.dataset.url);
+    xhr.send();
+
+    xhr.onload = function () {
+      if (xhr.status !== 200 || !this.render(xhr.response)) {
+        this.schedule();
+      }
+    }.bind(this);
+    xhr.onerror = this.schedule.bind(this);
+  }
+
+  schedule() {
+    setTimeout(this.poll.bind(this), 2000);
+  }
+
+  // Returns true when job is finished
+  render(job) {
+    if (job.state === 'done') {
+      window.location.href = this.el.dataset.next;
+      return true;
+    }
+    if (job.state === 'failed') {
+      this.progress_el.style.display = 'none';
+      this.error_el.style.display = 'block';
+      this.error_details_el.textContent = job.error || '';
+      return true;
+    }
+    this.phase_el.textContent = job.phase || 'Waiting for worker...';
+    this.bar_el.style.width = `${job.progress}%`;
+
+    let details = [];
+    if (job.items_total) {
+      details.push(`${job.items_done} of ${job.items_total}`);
+    }
+    if (job.requests_count) {
+      details.push(`${job.requests_count} requests`);
+    }
+    this.details_el.textContent = details.join(', ');
+    return false;
+  }
+}
+
+// Load for job.html
+document.addEventListener('DOMContentLoaded', function () {
+  let el = document.getElementById('job');
+  if (el) {
+    let job = new Job(el);
+  }
+});
@@ -0,0 +1,131 @@
+class Worklogs {
+  constructor(table) {
+    this.table = table;
+    this.body = table.querySelector('tbody');
+    this.more_el = document.getElementById('worklogs-more');
+    this.empty_el = document.getElementById('worklogs-empty');
+    this.filters_el = document.getElementById('worklogs-filters');
+    this.editable = table.dataset.editable === 'true';
+    this.reset();
+    this.addEvents();
+    this.load();
+  }
+
+  addEvents() {
+    this.more_el.addEventListener('click', this.load.bind(this));
+    if (this.filters_el) {
+      this.filters_el.addEventListener('submit', function (e) {
+        e.preventDefault();
+        this.reset();
+        this.load();
+      }.bind(this));
+    }
+  }
+
+  reset() {
+    this.cursor = null;
+    this.count = 0;
+    this.body.innerHTML = '';
+  }
+
+  query() {
+    let params = new URLSearchParams();
+    Object.entries({sync_id: 'syncId', order: 'order'}).forEach(([name, key]) => {
+      if (this.table.dataset[key]) {
+        params.set(name, this.table.dataset[key]);
+      }
+    });
+    if (this.filters_el) {
+      new FormData(this.filters_el).forEach((value, name) => {
+        if (value) {
+          params.set(name, value);
+        }
+      });
+    }
+    if (this.cursor) {
+      params.set('cursor', this.cursor);
+    }
+    return params.toString();
+  }
+
+  load() {
+    let xhr = new XMLHttpRequest();
+    xhr.responseType = 'json';
+    xhr.open('GET', `${this.table.dataset.url}?${this.query()}`);
+    xhr.send();
+    this.more_el.disabled = true;
+
+    xhr.onload = function () {
+      if (xhr.status !== 200) {
+        this.more_el.disabled = false;
+        return;
+      }
+      xhr.response.results.forEach(worklog => this.addRow(worklog));
+      this.cursor = xhr.response.cursor;
+      this.more_el.disabled = false;
+      this.more_el.style.display = this.cursor ? 'inline-block' : 'none';
+      this.empty_el.style.display = this.count ? 'none' : 'block';
+    }.bind(this);
+    xhr.onerror = function () {
+      this.more_el.disabled = false;
+    }.bind(this);
+  }
+
+  addRow(worklog) {
+    let row = this.body.insertRow();
+    let next = encodeURIComponent(window.location.pathname);
+    let comment = escapeHtml(worklog.comment);
+
+    this.count += 1;
+    if (this.editable) {
+      row.className = worklog.is_valid ? 'table-success' : 'table-danger';
+      if (!worklog.is_valid) {
+        comment += worklog.issue_id
+          ? `<div><span class="badge badge-danger">Error: Issue ID is not exist in ${escapeHtml(this.table.dataset.connectorName)}</span></div>`
+          : '<div><span class="badge badge-danger">Missed Issue ID</span></div>';
+      }
+    }
+
+    let actions = `<a href="/worklogs/delete/${worklog.id}?next=${next}"><i class="fa fa-trash-alt" aria-hidden="true"></i></a>`;
+    if (this.editable) {
+      actions = `<a href="/worklogs/edit/${worklog.id}?next=${next}"><i class="fa fa-pencil-alt" aria-hidden="true"></i></a> ` + actions;
+    }
+
+    row.innerHTML = `
+      <th scope="row">${this.count}</th>
+      <td>${comment}</td>
+      <td>${formatDate(worklog.date_started)}</td>
+      <td>${formatDate(worklog.date_stopped)}</td>
+      <td>${formatDuration(worklog.duration)}</td>
+      <td>${escapeHtml(worklog.issue_id)}</td>
+      <td><i class="far ${worklog.is_valid ? 'fa-check-circle' : 'fa-times-circle'}"></i></td>
+      <td class="text-center">${actions}</td>`;
+  }
+}
+
+function escapeHtml(value) {
+  let el = document.createElement('span');
+  el.textContent = value || '';
+  return el.innerHTML;
+}
+
+// Dates are returned in timezone of user
+function formatDate(iso) {
+  return iso ? moment.parseZone(iso).format('YYYY-MM-DD HH:mm:ss') : '';
+}
+
+function formatDuration(seconds) {
+  let sign = seconds < 0 ? '-' : '';
+  seconds = Math.abs(seconds);
+  let minutes = Math.floor(seconds % 3600 / 60);
+  let rest = seconds % 60;
+  return `${sign}${Math.floor(seconds / 3600)}:${String(minutes).padStart(2, '0')}:${String(rest).padStart(2, '0')}`;
+}
+
+// Load for worklogs.html and validation.html
+document.addEventListener('DOMContentLoaded', function () {
+  let table = document.getElementById('worklogs');
+  if (table) {
+    let worklogs = new Worklogs(table);
+  }
+});
@@ -1,5 +1,9 @@
 import hashlib
+import threading
+import time as _time
 from base64 import b64decode, b64encode
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, time, timedelta
 
 import iso8601
@@ -120,3 +124,111 @@ class DateAndTime(object):
             date2 = self.parse_iso_str(date2)
 
         return date1.date() == date2.date()
+
+
+class LRUCache(object):
+    """
+    Thread safe in-memory cache with limited size and optional TTL.
+    Least recently used entries are evicted first when cache is full.
+    """
+    _MISSING = object()
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key, default=None):
+        """
+        Returns cached value or default if key is missed or expired
+        """
+        with self._lock:
+            value, expires_at = self._data.get(key, (self._MISSING, None))
+            if value is not self._MISSING and (
+                expires_at is not None and expires_at < _time.monotonic()
+            ):
+                del self._data[key]
+                value = self._MISSING
+
+            if value is self._MISSING:
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Puts value to cache. Custom TTL in seconds could be specified
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (
+                value,
+                _time.monotonic() + ttl if ttl is not None else None
+            )
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """
+        Removes key from cache and returns its value
+        """
+        with self._lock:
+            value, _ = self._data.pop(key, (default, None))
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        Returns cache counters
+        """
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight(object):
+    """
+    Runs functions in a bounded pool of threads. Concurrent calls with the
+    same key share one call: the caller that came later gets the future of
+    the call which is still running
+    """
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = {}
+        self._lock = threading.RLock()
+
+    def submit(self, key, func, *args, **kwargs):
+        """
+        Returns future of the call of func with key
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = self._executor.submit(func, *args, **kwargs)
+                self._futures[key] = future
+                future.add_done_callback(
+                    lambda f: self._forget(key, f)
+                )
+            return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
@@ -1,10 +1,46 @@
 """API views"""
 
-from flask import Blueprint, jsonify, request
-from flask_login import login_required
+import json
+import os
+import re
+import time
+
+from concurrent.futures import TimeoutError
+from datetime import datetime, timedelta
+
+import iso8601
+import pytz
+from flask import (Blueprint, Response, abort, jsonify, request,
+                   stream_with_context)
+from flask_login import current_user, login_required
 
 from synchronizer.connectors.manager import ConnectorManager
-from synchronizer.models import ConnectorType, Synchronization
+from synchronizer.models import (ConnectorType, Issue, IssueUsage, Job,
+                                 Synchronization, Worklog, db)
+from synchronizer.utils import LRUCache, SingleFlight
+
+# Seconds between checks of job in progress stream and max duration of one
+# stream. Stream is short, because it holds a process of web server, so no
+# keep-alive messages are needed, browser reconnects in
+# PROGRESS_STREAM_RETRY milliseconds
+PROGRESS_STREAM_INTERVAL = float(
+    os.environ.get('PROGRESS_STREAM_INTERVAL', 1)
+)
+PROGRESS_STREAM_TIMEOUT = float(os.environ.get('PROGRESS_STREAM_TIMEOUT', 5))
+PROGRESS_STREAM_RETRY = int(os.environ.get('PROGRESS_STREAM_RETRY', 1000))
+
+# Found issues by (target connector ID, lowercased term). Searches of the
+# same term are made once at a time and a request waits for them at most
+# ISSUE_SEARCH_TIMEOUT seconds
+ISSUE_SEARCH_CACHE = LRUCache(
+    max_size=int(os.environ.get('ISSUE_SEARCH_CACHE_SIZE', 2000)),
+    ttl=int(os.environ.get('ISSUE_SEARCH_CACHE_TTL', 60))
+)
+ISSUE_SEARCH_TIMEOUT = float(os.environ.get('ISSUE_SEARCH_TIMEOUT', 2))
+ISSUE_SEARCHES = SingleFlight(
+    max_workers=int(os.environ.get('ISSUE_SEARCH_WORKERS', 8))
+)
+ISSUE_KEY_RE = re.compile(r'^[A-Z0-9]+-[0-9]+$')
 
 
 api_routes = Blueprint(
@@ -30,31 +66,30 @@ def issues():
     Returns all issues from all current source for keyword
     """
     results = []
+    term = request.args.get('term')
 
-    try:
-        sync_id = request.args.get('sync_id')
-        term = request.args.get('term')
-
-        if not term:
-            return jsonify({'results': []})
+    if not term:
+        return jsonify({'results': []})
 
-        s = Synchronization.query.get(sync_id)
-
-        target_connector = ConnectorManager.create_connector(
-            s.target.connector_type.name,
-            server=s.target.server,
-            api_token=s.target.api_token,
-            login=s.target.login,
-            password=s.target.password
+    s = Synchronization.query.get(request.args.get('sync_id', type=int) or 0)
+    if s and s.user_id == current_user.get_id():
+        # Issues used by user before go first, target is searched only if
+        # there are not enough of them
+        raw_results = IssueUsage.suggest(
+            current_user.get_id(), s.target, term
         )
+        if len(raw_results) < IssueUsage.SUGGESTIONS_LIMIT:
+            found = find_issues(s.target, term)
+            names = {r['id']: r['name'] for r in found}
+            for r in raw_results:
+                name = names.pop(r['id'], '')
+                r['name'] = r['name'] or name
+            raw_results += [r for r in found if r['id'] in names]
 
-        raw_results = target_connector.search_issues(term)
         results = [
             {'id': r['id'], 'text': '[{}] {}'.format(r['id'], r['name'])}
             for r in raw_results
         ]
-    except:
-        pass
 
     if not results:
         results = [{'id': term, 'text': 'Use "{}" as issue ID'.format(term)}]
@@ -62,6 +97,217 @@ def issues():
     return jsonify({'results': results})
 
 
+def find_issues(target, term):
+    """
+    Returns issues of target connector found by term. Cached issues are
+    returned if target is not available
+    """
+    # Issue with exactly the same ID is taken from cache
+    cached_issue = Issue.get_fresh(target, [term]).get(term)
+    if (
+        cached_issue and cached_issue.is_exists
+        and cached_issue.summary is not None
+    ):
+        return [{'id': cached_issue.issue_id, 'name': cached_issue.summary}]
+
+    try:
+        return search_issues(target, term)
+    except TimeoutError:
+        print('Search of "{}" in {} is too slow'.format(term, target.server))
+    except Exception as err:
+        # Target is not available, use cached issues. Session could be
+        # broken by failed saving of found issues
+        print(err)
+        db.session.rollback()
+    return Issue.search(target, term)
+
+
+def search_issues(target, term):
+    """
+    Returns issues of target connector found by term. Recent results are
+    reused, also complete results of a shorter term are filtered locally.
+    Raises TimeoutError if target doesn't answer in ISSUE_SEARCH_TIMEOUT
+    """
+    key = (target.id, term.lower())
+    results = get_cached_issues(*key)
+    if results is not None:
+        return results
+
+    connector = target.create_connector()
+
+    def search():
+        found = connector.search_issues(term)
+        # Search is finished and cached even if request didn't wait for it
+        ISSUE_SEARCH_CACHE.set(key, (
+            found,
+            connector.SEARCH_LIMIT is not None
+            and len(found) < connector.SEARCH_LIMIT
+        ))
+        return found
+
+    results = ISSUE_SEARCHES.submit(key, search).result(
+        timeout=ISSUE_SEARCH_TIMEOUT
+    )
+    Issue.store(target, {r['id']: (True, r['name']) for r in results})
+    return results
+
+
+def get_cached_issues(target_id, term):
+    """
+    Returns cached issues of lowercased term or None. Not truncated results
+    of the longest cached prefix of term could be used if term is a single
+    word and an issue key from term is among them
+    """
+    cached = ISSUE_SEARCH_CACHE.get((target_id, term))
+    if cached is not None:
+        return cached[0]
+
+    if len(term.split()) != 1:
+        return None
+
+    for length in range(len(term) - 1, 0, -1):
+        cached = ISSUE_SEARCH_CACHE.get((target_id, term[:length]))
+        if cached is None or not cached[1]:
+            continue
+
+        results = [
+            r for r in cached[0]
+            if r['id'].lower().startswith(term) or any(
+                word.startswith(term)
+                for word in (r['name'] or '').lower().split()
+            )
+        ]
+        # Target searches issue keys exactly, so key could be missed
+        if ISSUE_KEY_RE.match(term.upper()) and not any(
+            r['id'].lower() == term for r in results
+        ):
+            return None
+        return results
+
+    return None
+
+
+@api_routes.route('/worklogs')
+@login_required
+def worklogs():
+    """
+    Returns a page of worklogs of current user. Next page is requested with
+    `cursor` from the previous response. Filters:
+    date_from, date_to (YYYY-MM-DD in user timezone, inclusive), issue_id,
+    is_valid (true/false), sync_id, connector_id; order is asc or desc
+    """
+    tz = pytz.timezone(current_user.timezone.name)
+
+    def parse_date(name, days=0):
+        value = request.args.get(name)
+        if not value:
+            return None
+        return tz.localize(
+            datetime.strptime(value, '%Y-%m-%d') + timedelta(days=days)
+        )
+
+    try:
+        after = None
+        cursor = request.args.get('cursor')
+        if cursor:
+            date_started, worklog_id = cursor.rsplit('|', 1)
+            after = (iso8601.parse_date(date_started), int(worklog_id))
+
+        is_valid = request.args.get('is_valid')
+        page, last_key = Worklog.get_page(
+            current_user.get_id(),
+            after=after,
+            limit=request.args.get('limit', type=int),
+            descending=request.args.get('order', 'desc') != 'asc',
+            date_from=parse_date('date_from'),
+            date_to=parse_date('date_to', days=1),
+            issue_id=request.args.get('issue_id'),
+            is_valid=is_valid == 'true' if is_valid else None,
+            sync_id=request.args.get('sync_id', type=int),
+            connector_id=request.args.get('connector_id', type=int)
+        )
+    except ValueError:
+        abort(400)
+
+    return jsonify({
+        'results': [w.to_dict(tz) for w in page],
+        'cursor': '{}|{}'.format(
+            last_key[0].isoformat(), last_key[1]
+        ) if last_key else None
+    })
+
+
+@api_routes.route('/synchronizations/<int:sync_id>/summary')
+@login_required
+def synchronization_summary(sync_id):
+    """
+    Returns totals of synchronization in whole, per day and per issue
+    """
+    sync = Synchronization.query.filter_by(
+        id=sync_id, user_id=current_user.get_id()
+    ).first()
+    if not sync:
+        abort(404)
+
+    return jsonify(sync.get_summary(current_user.get_id()))
+
+
+@api_routes.route('/synchronizations/<int:sync_id>/progress')
+@login_required
+def synchronization_progress(sync_id):
+    """
+    Streams state and progress of the last job of synchronization as
+    Server-Sent Events. Event is sent only when progress is changed, the
+    stream is closed when the job is finished or after
+    PROGRESS_STREAM_TIMEOUT, then browser reconnects
+    """
+    sync = Synchronization.query.filter_by(
+        id=sync_id, user_id=current_user.get_id()
+    ).first()
+    if not sync:
+        abort(404)
+
+    def generate():
+        started = time.time()
+        sent = None
+        yield 'retry: {}\n\n'.format(PROGRESS_STREAM_RETRY)
+
+        while time.time() - started < PROGRESS_STREAM_TIMEOUT:
+            job = Job.get_last(sync_id)
+            data = job.to_dict() if job else None
+            # End transaction to read changes of worker on next check
+            db.session.rollback()
+
+            if data != sent:
+                sent = data
+                yield 'data: {}\n\n'.format(json.dumps(data))
+                if not data or data['state'] in (
+                    Job.STATE_DONE, Job.STATE_FAILED
+                ):
+                    return
+
+            time.sleep(PROGRESS_STREAM_INTERVAL)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@api_routes.route('/jobs/<int:job_id>')
+@login_required
+def job_state(job_id):
+    """
+    Returns state and progress of background job
+    """
+    job = Job.query.get(job_id)
+    if not job or job.synchronization.user_id != current_user.get_id():
+        abort(404)
+
+    return jsonify(job.to_dict())
+
+
 @api_routes.route('/connector/<int:connector_type_id>')
 @login_required
 def get_connector_type_fields(connector_type_id):
@@ -2,10 +2,11 @@
 
 from flask import Blueprint, abort, redirect, render_template, request, url_for, flash
 from flask_login import current_user, login_required
+from sqlalchemy.exc import IntegrityError
 from synchronizer.models import ConnectorType
 
 from synchronizer.forms import ConnectorForm, SyncForm, UserForm, WorklogForm
-from synchronizer.models import Connector, Synchronization, User, Worklog, db, lm
+from synchronizer.models import Connector, IssueUsage, Job, Synchronization, User, Worklog, db, lm
 from synchronizer.connectors.manager import ConnectorManager
 
 
@@ -15,6 +16,10 @@ app_routes = Blueprint(
     template_folder='templates'
 )
 
+DUPLICATE_WORKLOG_ERROR = (
+    'The same worklog is already imported and valid, edit or delete it'
+)
+
 
 # Load user for flask_login
 @lm.user_loader
@@ -22,7 +27,7 @@ def load_user(user_id):
     """
     Return user object by ID
     """
-    return User.query.get(user_id)
+    return User.query.options(db.joinedload(User.timezone)).get(user_id)
 
 
 ######
@@ -169,15 +174,10 @@ def edit_connector(connector_id):
 @login_required
 def get_worklogs():
     """
-    Get list of connectors
+    Render worklogs page, worklogs are loaded by pages from API
     """
-    worklogs = Worklog.query.filter(
-        Worklog.user_id == current_user.get_id(),
-        Worklog.parent_id == None  # NOQA
-    ).order_by(Worklog.date_started.desc()).limit(1000).all()
     return render_template(
         "worklogs.html",
-        worklogs=worklogs,
         title="My Worklogs"
     )
 
@@ -207,24 +207,44 @@ def edit_worklog(worklog_id):
     form.issue_id.choices = [(w.issue_id, w.issue_id)]
 
     if form.validate_on_submit():
-        w.comment = form.comment.data
-        w.issue_id = form.issue_id.data
-
         # Mark as valid when both comment and issue_id presented
-        w.is_valid = bool(form.comment.data and form.issue_id.data)
-
-        # Update children worklogs if any
-        for child in w.children:
-            child.comment = w.comment
-            child.issue_id = w.issue_id
-            child.is_valid = w.is_valid
-
-        db.session.add(w)
-        db.session.commit()
-
-        return redirect(
-            request.args.get("next") or url_for("app_routes.index")
-        )
+        is_valid = bool(form.comment.data and form.issue_id.data)
+
+        if is_valid and w.has_valid_duplicates():
+            form.issue_id.errors.append(DUPLICATE_WORKLOG_ERROR)
+        else:
+            old_issue_id = w.issue_id
+            w.comment = form.comment.data
+            w.issue_id = form.issue_id.data
+
+            if w.issue_id != old_issue_id:
+                IssueUsage.record(
+                    w.user_id,
+                    w.synchronization.target_id,
+                    added=[(w.issue_id, w.date_started)],
+                    removed=[(old_issue_id, w.date_started)],
+                    with_commit=False
+                )
+
+            w.is_valid = is_valid
+
+            # Update children worklogs if any
+            for child in w.children:
+                child.comment = w.comment
+                child.issue_id = w.issue_id
+                child.is_valid = w.is_valid
+
+            db.session.add(w)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # The same worklog was made valid by another request
+                db.session.rollback()
+                form.issue_id.errors.append(DUPLICATE_WORKLOG_ERROR)
+            else:
+                return redirect(
+                    request.args.get("next") or url_for("app_routes.index")
+                )
     return render_template(
         "worklog.html",
         form=form,
@@ -246,11 +266,18 @@ def get_synchronizations():
     """
     synchronizations = Synchronization.query.filter_by(
         user_id=current_user.get_id()
+    ).options(
+        db.joinedload(Synchronization.source),
+        db.joinedload(Synchronization.target)
     ).order_by(Synchronization.date_created).all()
+    totals = Synchronization.get_totals(
+        [s.id for s in synchronizations], current_user.get_id()
+    )
 
     return render_template(
         "synchronizations.html",
         synchronizations=synchronizations,
+        totals=totals,
         incompleted_synchronizations=any([
             s for s in synchronizations if not s.is_completed and not s.is_cancelled]),
         title="My Synchronizations"
@@ -307,29 +334,14 @@ def run_sync():
             user_id=current_user.get_id()
         )
 
-        try:
-            new_sync.import_worklogs()
-            new_sync.validate_worklogs()
-        except Exception as err:
-            # If something went wrong remove sync and render error page
-            Synchronization.delete(new_sync.id)
-
-            errors = str(err)
-
-            return render_template(
-                "sync.html",
-                form=form,
-                title="Synchronize worklogs",
-                errors=errors
-            )
-
-        return redirect(
-            url_for(
-                "app_routes.validate_worklogs",
-                sync_id=new_sync.get_id()
-            )
+        # Worklogs are imported and validated by worker
+        job = Job.create(
+            synchronization_id=new_sync.get_id(),
+            action=Job.ACTION_IMPORT
         )
 
+        return redirect(url_for("app_routes.view_job", job_id=job.get_id()))
+
     # Show warning about not finished synchronizations
     errors = None
     unfinished_syncs = [
@@ -361,27 +373,25 @@ def validate_worklogs(sync_id):
     """
     Render worklogs validation page
     """
-    sync = Synchronization.query.get(sync_id)
+    sync = Synchronization.get_with_target(sync_id)
     if sync:
         if not sync.is_active():
             return redirect(
                 url_for('app_routes.view_synchronization', sync_id=sync_id)
             )
-        worklogs = Worklog.query.filter_by(
-            synchronization_id=sync_id,
-            user_id=current_user.get_id(),
-            parent_id=None
-        ).order_by(Worklog.date_started).all()
+        job = Job.get_active(sync_id)
+        if job:
+            return redirect(url_for('app_routes.view_job', job_id=job.id))
+        # Worklogs are loaded by pages from API
+        totals = sync.get_total(current_user.get_id())
 
         return render_template(
             "validation.html",
-            worklogs=worklogs,
+            totals=totals,
             title="Validate worklogs",
             sync_id=sync_id,
-            total_synchronized=sum(
-                [x.duration for x in worklogs if x.is_valid]
-            ),
-            total_skipped=sum([x.duration for x in worklogs if not x.is_valid]),
+            total_synchronized=totals['synchronized'],
+            total_skipped=totals['skipped'],
             connector_name=sync.target.connector_type.name,
         )
     return render_template(
@@ -397,40 +407,19 @@ def submit_synchronization(sync_id):
     """
     Render export worklogs page
     """
-    sync = Synchronization.query.get(sync_id)
+    sync = Synchronization.get_with_target(sync_id)
     if sync:
         if not sync.is_active():
             return redirect(
                 url_for('app_routes.view_synchronization', sync_id=sync_id)
             )
-        try:
-            sync.export_worklogs()
-        except Exception as err:
-            print(err)
-            return render_template(
-                "error.html",
-                title="Something goes wrong",
-                errors=err.message or "Sorry, but something goes wrong \
-                when we try to export your worklogs. \
-                We saved only successfully synchronized worklogs. \
-                Try again or contact administrator."
-            )
-        # Fetch all synchronized worklogs
-        worklogs = Worklog.query.filter_by(
-            synchronization_id=sync_id,
-            user_id=current_user.get_id(),
-            parent_id=None
-        ).order_by(Worklog.date_started).all()
-        return render_template(
-            "export.html",
-            worklogs=worklogs,
-            title="Export worklogs",
-            sync_id=sync_id,
-            total_synchronized=sum(
-                [x.duration for x in worklogs if x.is_valid]
-            ),
-            total_skipped=sum([x.duration for x in worklogs if not x.is_valid])
+        # Worklogs are exported by worker, the same job is shown again if
+        # page is reloaded
+        job = Job.get_active(sync_id) or Job.create(
+            synchronization_id=sync.get_id(),
+            action=Job.ACTION_EXPORT
         )
+        return redirect(url_for('app_routes.view_job', job_id=job.get_id()))
     return render_template(
         "error.html",
         title="Export worklogs",
@@ -438,6 +427,49 @@ def submit_synchronization(sync_id):
     )
 
 
+@app_routes.route('/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def view_job(job_id):
+    """
+    Render progress of background job. Page is redirected to the next step
+    of synchronization when the job is done
+    """
+    job = Job.query.get(job_id)
+    if not job or job.synchronization.user_id != current_user.get_id():
+        return render_template(
+            "error.html",
+            title="Synchronization",
+            errors="Sorry, but this job is not available."
+        )
+
+    if job.action == Job.ACTION_IMPORT:
+        title = "Import worklogs"
+        next_url = url_for(
+            'app_routes.validate_worklogs', sync_id=job.synchronization_id
+        )
+        error = "Sorry, but something goes wrong when we try to import \
+            your worklogs. Try again or contact administrator."
+    else:
+        title = "Export worklogs"
+        next_url = url_for(
+            'app_routes.view_synchronization', sync_id=job.synchronization_id
+        )
+        error = "Sorry, but something goes wrong when we try to export \
+            your worklogs. We saved only successfully synchronized \
+            worklogs. Try again or contact administrator."
+
+    if job.state == Job.STATE_DONE:
+        return redirect(next_url)
+
+    return render_template(
+        "job.html",
+        job=job,
+        title=title,
+        next_url=next_url,
+        error=error
+    )
+
+
 @app_routes.route('/sync/<sync_id>', methods=['GET'])
 @login_required
 def view_synchronization(sync_id):
@@ -453,20 +485,15 @@ def view_synchronization(sync_id):
                 message="This synchronization is still in progress"
             )
         # Fetch all synchronized worklogs
-        worklogs = Worklog.query.filter_by(
-            synchronization_id=sync_id,
-            user_id=current_user.get_id(),
-            parent_id=None
-        ).order_by(Worklog.date_started).all()
+        worklogs = sync.get_worklogs(current_user.get_id())
+        totals = sync.get_total(current_user.get_id())
         return render_template(
             "export.html",
             worklogs=worklogs,
             title="Export worklogs",
             sync_id=sync_id,
-            total_synchronized=sum(
-                [x.duration for x in worklogs if x.is_valid]
-            ),
-            total_skipped=sum([x.duration for x in worklogs if not x.is_valid])
+            total_synchronized=totals['synchronized'],
+            total_skipped=totals['skipped']
         )
     return render_template(
         "error.html",
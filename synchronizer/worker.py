@@ -0,0 +1,59 @@
+"""Worker running background jobs of synchronizations"""
+
+import os
+import socket
+import time
+
+import click
+from flask.cli import with_appcontext
+
+from synchronizer.models import Job, db
+
+# Seconds to wait before checking for new jobs again
+POLL_INTERVAL = float(os.environ.get('WORKER_POLL_INTERVAL', 2))
+
+
+def run_jobs(worker, once=False, interval=POLL_INTERVAL):
+    """
+    Runs pending jobs one by one. Waits for new jobs unless `once` is set
+    """
+    while True:
+        job = Job.claim(worker)
+        if job:
+            print('Job {} ({}) of synchronization {} is started'.format(
+                job.id, job.action, job.synchronization_id
+            ))
+            job_id = job.id
+            try:
+                is_done = job.run()
+            except Exception as err:
+                # Job must not stop the worker, e.g. if its synchronization
+                # is deleted while the job is saving its state
+                print('Job {} is broken: {}'.format(job_id, err))
+                db.session.rollback()
+                is_done = False
+            print('Job {} is {}'.format(
+                job_id, Job.STATE_DONE if is_done else Job.STATE_FAILED
+            ))
+            # Start every job with a clean session
+            db.session.remove()
+        elif once:
+            return
+        else:
+            time.sleep(interval)
+
+
+@click.command('worker')
+@click.option(
+    '--once', is_flag=True, help='Exit when there are no pending jobs.'
+)
+@click.option(
+    '--interval', default=POLL_INTERVAL, type=float,
+    help='Seconds between checks for new jobs.'
+)
+@with_appcontext
+def worker_command(once, interval):
+    """Run background jobs of synchronizations."""
+    run_jobs(
+        '{}:{}'.format(socket.gethostname(), os.getpid()), once, interval
+    )
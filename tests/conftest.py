@@ -0,0 +1,130 @@
+import os
+
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+from sqlalchemy import event
+
+# Models encrypt connector credentials with the secret key
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+
+from flask import Flask  # NOQA
+from flask_login import login_user  # NOQA
+from synchronizer.connectors.manager import ConnectorManager  # NOQA
+from synchronizer.models import (Connector, ConnectorType,  # NOQA
+                                 Synchronization, Timezone, User, db, lm)
+
+
+@pytest.fixture
+def app():
+    """
+    Returns application with empty database (in-memory SQLite by default,
+    set TEST_DATABASE_URI to use another one)
+    """
+    app = Flask('synchronizer')
+    app.config.update(
+        TESTING=True,
+        SECRET_KEY=os.environ['SECRET_KEY'],
+        SQLALCHEMY_DATABASE_URI=os.environ.get(
+            'TEST_DATABASE_URI', 'sqlite://'
+        ),
+        SQLALCHEMY_TRACK_MODIFICATIONS=False
+    )
+    db.init_app(app)
+    lm.init_app(app)
+    # Connector IDs are reused by every new database
+    ConnectorManager.POOL.clear()
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        drop_tables()
+
+
+@contextmanager
+def count_queries():
+    """
+    Counts SQL queries executed inside of the block
+    """
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        queries.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(
+            db.engine, 'before_cursor_execute', before_cursor_execute
+        )
+
+
+def drop_tables():
+    """
+    Drops all tables. Users and connectors reference each other, so
+    tables are dropped with CASCADE where it is supported
+    """
+    if db.engine.name != 'postgresql':
+        db.drop_all()
+        return
+
+    for table in db.metadata.sorted_tables:
+        db.session.execute(
+            'DROP TABLE IF EXISTS {} CASCADE'.format(table.name)
+        )
+    db.session.commit()
+
+
+@pytest.fixture
+def user(app):
+    u = User(
+        username='user',
+        email='user@example.com',
+        timezone=Timezone(name='UTC')
+    )
+    db.session.add(u)
+    db.session.commit()
+    return u
+
+
+@pytest.fixture
+def logged_in(app, user):
+    """
+    Runs test inside of request of logged in user
+    """
+    with app.test_request_context():
+        login_user(user)
+        yield user
+
+
+@pytest.fixture
+def target(user):
+    """
+    Returns Jira target connector of the user
+    """
+    connector_type = ConnectorType(name='Jira', ctype='target')
+    db.session.add(connector_type)
+    db.session.commit()
+    return Connector.create(
+        name='Jira',
+        server='jira.example.com',
+        login='login',
+        password='',
+        api_token='token',
+        user_id=user.id,
+        connector_type_id=connector_type.id
+    )
+
+
+@pytest.fixture
+def sync(user, target):
+    return Synchronization.create(
+        source_id=target.id,
+        target_id=target.id,
+        date_started_from=datetime(2020, 1, 1),
+        user_id=user.id
+    )
@@ -0,0 +1,128 @@
+import threading
+
+from datetime import datetime
+
+import pytest
+import pytz
+
+import synchronizer.views.api as api
+from synchronizer.connectors.manager import ConnectorManager
+from synchronizer.models import IssueUsage
+
+
+class FakeConnector(object):
+    SEARCH_LIMIT = 50
+
+    def __init__(self, issues, release=None):
+        self.issues = issues
+        self.release = release
+        self.terms = []
+
+    def clone(self, progress_callback=None):
+        return self
+
+    def search_issues(self, term):
+        self.terms.append(term)
+        if self.release:
+            self.release.wait(5)
+        return [
+            i for i in self.issues
+            if i['id'].startswith(term) or term in i['name']
+        ]
+
+
+@pytest.fixture
+def search(monkeypatch, app, user, sync):
+    """
+    Returns function returning IDs of issues found by /api/issues
+    """
+    api.ISSUE_SEARCH_CACHE.clear()
+    app.register_blueprint(api.api_routes, url_prefix='/api')
+    app.config['LOGIN_DISABLED'] = True
+    monkeypatch.setattr(api, 'current_user', user)
+    client = app.test_client()
+
+    def search(term):
+        response = client.get(
+            '/api/issues', query_string={'sync_id': sync.id, 'term': term}
+        )
+        return [r['id'] for r in response.get_json()['results']]
+
+    return search
+
+
+def use_connector(monkeypatch, connector):
+    ConnectorManager.POOL.clear()
+    monkeypatch.setattr(
+        ConnectorManager, 'create_connector',
+        staticmethod(lambda connector_name, **kwargs: connector)
+    )
+
+
+def test_issues_of_longer_term_are_found_locally(monkeypatch, search):
+    """
+    Test if complete results of a term are reused by terms starting with it
+    """
+    connector = FakeConnector([
+        {'id': 'ABC-1', 'name': 'Fix login'},
+        {'id': 'ABC-12', 'name': 'Fix logout'},
+    ])
+    use_connector(monkeypatch, connector)
+
+    assert search('lo') == ['ABC-1', 'ABC-12']
+    assert search('Log') == ['ABC-1', 'ABC-12']
+    assert search('logo') == ['ABC-12']
+    assert search('ABC') == ['ABC-1', 'ABC-12']
+    assert connector.terms == ['lo', 'ABC']
+
+    # Key which is not among results of prefix is searched in target
+    assert search('ABC-13') == ['ABC-13']
+    assert connector.terms == ['lo', 'ABC', 'ABC-13']
+
+
+def test_slow_searches_are_coalesced(monkeypatch, sync, search):
+    """
+    Test if request doesn't wait for slow target and the same term is
+    searched only once
+    """
+    release = threading.Event()
+    connector = FakeConnector(
+        [{'id': 'ABC-1', 'name': 'Fix login'}], release=release
+    )
+    use_connector(monkeypatch, connector)
+    monkeypatch.setattr(api, 'ISSUE_SEARCH_TIMEOUT', 0.05)
+
+    # Issue ID itself is suggested while target is searching
+    assert search('login') == ['login']
+    assert search('login') == ['login']
+    assert connector.terms == ['login']
+
+    # Search is still running, so its future is returned
+    future = api.ISSUE_SEARCHES.submit((sync.target_id, 'login'), None)
+    release.set()
+    future.result(5)
+    assert search('login') == ['ABC-1']
+    assert connector.terms == ['login']
+
+
+def test_used_issues_are_suggested_first(monkeypatch, user, sync, search):
+    """
+    Test if issues used by user go first and target isn't searched if
+    there are enough of them
+    """
+    connector = FakeConnector([
+        {'id': 'ABC-1', 'name': 'Fix login'},
+        {'id': 'ABC-7', 'name': 'Fix logout'},
+    ])
+    use_connector(monkeypatch, connector)
+    IssueUsage.record(user.id, sync.target_id, added=[
+        ('ABC-7', datetime(2020, 1, 2, tzinfo=pytz.utc))
+    ])
+
+    monkeypatch.setattr(IssueUsage, 'SUGGESTIONS_LIMIT', 1)
+    assert search('ABC') == ['ABC-7']
+    assert connector.terms == []
+
+    monkeypatch.setattr(IssueUsage, 'SUGGESTIONS_LIMIT', 10)
+    assert search('ABC') == ['ABC-7', 'ABC-1']
+    assert connector.terms == ['ABC']
@@ -0,0 +1,172 @@
+import io
+
+from http.client import parse_headers
+
+import pytest
+import requests
+
+from requests.adapters import BaseAdapter
+from urllib3 import HTTPResponse
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.util.retry import Retry
+
+from synchronizer.connectors.base import (HTTP_CONNECT_TIMEOUT,
+                                          HTTP_RATE_LIMIT_RETRIES,
+                                          HTTP_READ_TIMEOUT, BaseConnector,
+                                          HttpTransport)
+from synchronizer.connectors.breaker import CircuitBreaker, CircuitOpenError
+from synchronizer.connectors.gitlab import GitlabConnector
+from synchronizer.connectors.ratelimit import RateLimiter
+
+
+class FakeRaw(object):
+    """
+    Raw urllib3 response, only its headers are used by cookie jar
+    """
+    def __init__(self, headers):
+        self._original_response = self
+        self.msg = parse_headers(io.BytesIO(''.join(
+            '{}: {}\r\n'.format(name, value) for name, value in headers
+        ).encode() + b'\r\n'))
+
+
+class FakeAdapter(BaseAdapter):
+    """
+    Answers requests of session with given responses and remembers them
+    """
+    def __init__(self, responses):
+        super(FakeAdapter, self).__init__()
+        self.responses = responses
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append((request, kwargs))
+        status_code, headers = self.responses.pop(0)
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers = requests.structures.CaseInsensitiveDict(headers)
+        response.raw = FakeRaw(headers)
+        response._content = b''
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def transport(tmp_path, monkeypatch):
+    transport = HttpTransport('test')
+    monkeypatch.setattr(
+        transport, 'circuit_breaker',
+        CircuitBreaker(threshold=2, directory=str(tmp_path))
+    )
+    monkeypatch.setattr(
+        transport, 'rate_limiter',
+        RateLimiter(directory=str(tmp_path), sleep=lambda seconds: None)
+    )
+    return transport
+
+
+def mount(transport, *responses):
+    adapter = FakeAdapter(list(responses))
+    transport.session.mount('https://', adapter)
+    return adapter
+
+
+def test_default_timeouts(transport):
+    """
+    Test if requests have default timeouts unless another one is given
+    """
+    adapter = mount(transport, (200, []), (200, []))
+
+    transport.request('get', 'https://jira.example.com/api')
+    transport.request('get', 'https://jira.example.com/api', timeout=1)
+
+    assert [kwargs['timeout'] for _, kwargs in adapter.requests] == [
+        (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), 1
+    ]
+
+
+def test_retry_policy_of_connector(transport):
+    """
+    Test if transport of connector retries requests by its own policy and
+    only connection errors are retried by default
+    """
+    for scheme in ['http://', 'https://']:
+        adapter = GitlabConnector.get_transport().session.get_adapter(scheme)
+        assert adapter.max_retries is GitlabConnector.HTTP_RETRY
+
+        retry = transport.session.get_adapter(scheme).max_retries
+        assert retry.connect == 3 and not retry.status_forcelist
+    assert not BaseConnector.HTTP_RETRY.status_forcelist
+    assert GitlabConnector.HTTP_RETRY.status_forcelist == (502, 503, 504)
+
+
+def test_server_errors_are_retried_and_open_breaker(
+    transport, monkeypatch
+):
+    """
+    Test if 5xx responses are retried by the policy and then counted by
+    breaker together with 5xx responses which are not retried
+    """
+    requested = []
+
+    def make_request(self, conn, method, url, **kwargs):
+        requested.append(url)
+        return HTTPResponse(
+            body=io.BytesIO(b''), status=503, preload_content=False,
+            request_method=method, request_url=url
+        )
+
+    monkeypatch.setattr(HTTPConnectionPool, '_make_request', make_request)
+    transport.session.get_adapter('http://').max_retries = Retry(
+        total=2, backoff_factor=0, status_forcelist=(502, 503, 504)
+    )
+
+    with pytest.raises(requests.exceptions.RetryError):
+        transport.request('get', 'http://gitlab.example.com/api')
+    assert requested == ['/api'] * 3
+
+    transport.session.get_adapter('http://').max_retries = Retry(0)
+    response = transport.request('get', 'http://gitlab.example.com/api')
+    assert response.status_code == 503
+    assert len(requested) == 4
+
+    with pytest.raises(CircuitOpenError):
+        transport.request('get', 'http://gitlab.example.com/api')
+    assert len(requested) == 4
+
+
+def test_rejected_requests_are_retried_limited_times(transport):
+    """
+    Test if requests rejected by rate limit are sent again, but the last
+    rejection is returned when retries are exhausted
+    """
+    adapter = mount(
+        transport,
+        *[(429, [('Retry-After', '0')])] * (HTTP_RATE_LIMIT_RETRIES + 2)
+    )
+
+    response = transport.request('get', 'https://jira.example.com/api')
+
+    assert response.status_code == 429
+    assert len(adapter.requests) == HTTP_RATE_LIMIT_RETRIES + 1
+
+
+def test_cookies_are_not_stored(transport):
+    """
+    Test if cookies of one user are never sent with requests of another
+    """
+    adapter = mount(
+        transport,
+        (200, [('Set-Cookie', 'session=first; Path=/')]),
+        (200, [])
+    )
+
+    transport.request('get', 'https://jira.example.com/api')
+    transport.request('get', 'https://jira.example.com/api')
+
+    assert len(transport.session.cookies) == 0
+    assert 'Cookie' not in adapter.requests[1][0].headers
@@ -0,0 +1,106 @@
+import pytest
+import requests
+
+from click.testing import CliRunner
+
+from synchronizer.breakers import breakers_command
+from synchronizer.connectors.base import HttpTransport
+from synchronizer.connectors.breaker import CircuitBreaker, CircuitOpenError
+from synchronizer.connectors.ratelimit import RateLimiter
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1600000000.0
+
+    def time(self):
+        return self.now
+
+
+def test_breaker_opens_and_probes(tmp_path):
+    """
+    Test if breaker fails fast after failures and lets one probe through
+    """
+    clock = Clock()
+    breaker = CircuitBreaker(
+        threshold=2, reset_timeout=30, directory=str(tmp_path),
+        clock=clock.time
+    )
+    other_process = CircuitBreaker(
+        threshold=2, reset_timeout=30, directory=str(tmp_path),
+        clock=clock.time
+    )
+    host = 'jira.example.com'
+
+    for i in range(2):
+        with pytest.raises(OSError):
+            with breaker.guard(host):
+                raise ConnectionRefusedError()
+
+    with pytest.raises(CircuitOpenError):
+        other_process.before_request(host)
+
+    # Only one probe is made when breaker is half-open
+    clock.now += 30
+    breaker.before_request(host)
+    with pytest.raises(CircuitOpenError):
+        other_process.before_request(host)
+
+    breaker.record(host, True)
+    other_process.before_request(host)
+    assert [s['state'] for s in breaker.get_all()] == ['closed']
+
+
+def test_transport_fails_fast_when_host_is_down(tmp_path, monkeypatch):
+    """
+    Test if transport stops requesting host after connection errors and
+    the breaker is shown by command
+    """
+    transport = HttpTransport('test')
+    breaker = CircuitBreaker(threshold=2, directory=str(tmp_path))
+    monkeypatch.setattr(HttpTransport, 'circuit_breaker', breaker)
+    monkeypatch.setattr(
+        transport, 'rate_limiter', RateLimiter(directory=str(tmp_path))
+    )
+    requested = []
+
+    def request(method, url, **kwargs):
+        requested.append(url)
+        raise requests.ConnectTimeout()
+
+    monkeypatch.setattr(transport.session, 'request', request)
+
+    for i in range(3):
+        with pytest.raises(requests.ConnectionError):
+            transport.request('get', 'https://jira.example.com/api')
+    assert len(requested) == 2
+
+    output = CliRunner().invoke(breakers_command).output
+    assert output.startswith('jira.example.com\topen\tfailures in a row: 2')
+
+    CliRunner().invoke(breakers_command, ['--reset', 'jira.example.com'])
+    assert breaker.get_all()[0]['state'] == 'closed'
+
+
+def test_transport_counts_exhausted_retries(tmp_path, monkeypatch):
+    """
+    Test if 5xx responses retried by the connector policy until retries
+    are exhausted are failures of host
+    """
+    transport = HttpTransport('test')
+    breaker = CircuitBreaker(threshold=2, directory=str(tmp_path))
+    monkeypatch.setattr(HttpTransport, 'circuit_breaker', breaker)
+    monkeypatch.setattr(
+        transport, 'rate_limiter', RateLimiter(directory=str(tmp_path))
+    )
+
+    def request(method, url, **kwargs):
+        raise requests.exceptions.RetryError('Max retries exceeded')
+
+    monkeypatch.setattr(transport.session, 'request', request)
+
+    for i in range(2):
+        with pytest.raises(requests.exceptions.RetryError):
+            transport.request('get', 'https://gitlab.example.com/api')
+    with pytest.raises(CircuitOpenError):
+        transport.request('get', 'https://gitlab.example.com/api')
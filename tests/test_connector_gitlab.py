@@ -0,0 +1,242 @@
+import random
+import time
+
+from synchronizer.connectors.gitlab import (ISSUE_WORKLOGS_CACHE,
+                                            GitlabConnector)
+
+
+def create_connector(**kwargs):
+    return GitlabConnector(
+        server='gitlab.example.com', api_token='token', **kwargs
+    )
+
+
+def test_map_concurrently_keeps_order():
+    """
+    Test if results of concurrent calls are returned in order of items
+    """
+    connector = create_connector(max_workers=8)
+
+    def slow_square(x):
+        time.sleep(random.random() / 100)
+        return x * x
+
+    assert connector.map_concurrently(slow_square, range(50)) \
+        == [x * x for x in range(50)]
+
+
+def test_import_worklogs_merges_issues_deterministically():
+    """
+    Test if worklogs fetched in parallel are merged in order of issues
+    """
+    connector = create_connector(max_workers=4)
+    issues = [(1, iid, 3600) for iid in range(20)]
+    connector.get_all_issues = lambda updated_after: issues
+
+    def get_worklogs_from_issue(
+        project_id, issue_iid, start_date, end_date, full=False,
+        windowed=False
+    ):
+        time.sleep(random.random() / 100)
+        return [{
+            'source_id': '{}-{}'.format(issue_iid, i),
+            'date_started': '2020-01-02T00:00:00+00:00'
+        } for i in range(2)]
+
+    connector.get_worklogs_from_issue = get_worklogs_from_issue
+
+    worklogs = connector.import_worklogs(
+        '2020-01-01T00:00:00+00:00',
+        '2020-01-03T00:00:00+00:00'
+    )
+    assert [w['source_id'] for w in worklogs] == [
+        '{}-{}'.format(iid, i) for _, iid, _ in issues for i in range(2)
+    ]
+
+
+def test_import_worklogs_reports_progress():
+    """
+    Test if progress of issues processed by threads is reported
+    """
+    reported = []
+    connector = create_connector(
+        max_workers=4, progress_callback=reported.append
+    )
+    connector.get_all_issues = lambda updated_after: [
+        (1, iid, None) for iid in range(10)
+    ]
+
+    def get_worklogs_from_issue(*args, **kwargs):
+        connector.report_progress(requests=2)
+        return []
+
+    connector.get_worklogs_from_issue = get_worklogs_from_issue
+    connector.import_worklogs(
+        '2020-01-01T00:00:00+00:00', '2020-01-03T00:00:00+00:00'
+    )
+
+    assert reported[0]['phase'] == 'Fetching issues'
+    assert reported[-1] == {
+        'phase': 'Fetching time spent of issues',
+        'done': 10,
+        'total': 10,
+        'requests': 20
+    }
+
+
+def test_issues_without_changed_time_stats_are_not_scanned():
+    """
+    Test if notes are fetched only for issues with changed time spent
+    """
+    ISSUE_WORKLOGS_CACHE.clear()
+    connector = create_connector(max_workers=1)
+    scanned = []
+
+    def get_worklogs_from_issue(
+        project_id, issue_iid, start_date, end_date, full=False,
+        windowed=False
+    ):
+        scanned.append(issue_iid)
+        return [{'source_id': str(issue_iid)}]
+
+    connector.get_worklogs_from_issue = get_worklogs_from_issue
+
+    def fetch(issue_iid, total_time_spent):
+        return connector.get_cached_worklogs_from_issue(
+            1, issue_iid, total_time_spent, None, None
+        )
+
+    # No time spent at all
+    assert fetch(1, 0) == []
+    assert scanned == []
+
+    # First import scans notes, the next one uses cache
+    assert fetch(2, 60) == [{'source_id': '2'}]
+    assert fetch(2, 60) == [{'source_id': '2'}]
+    assert scanned == [2]
+
+    # Time stats were changed
+    assert fetch(2, 120) == [{'source_id': '2'}]
+    assert scanned == [2, 2]
+
+
+class FakeResponse(object):
+    def __init__(self, items, headers=None, links=None):
+        self.items = items
+        self.headers = headers or {}
+        self.links = links or {}
+
+    def json(self):
+        return self.items
+
+
+def test_get_pages_stops_on_next_page_header():
+    """
+    Test if pagination doesn't request page after the last one
+    """
+    connector = create_connector()
+    requested = []
+
+    def request(method, endpoint, data=None, **kwargs):
+        requested.append(data['page'])
+        return FakeResponse(
+            [data['page']],
+            {'X-Next-Page': '' if data['page'] == 2 else str(data['page'] + 1)}
+        )
+
+    connector._request = request
+    assert list(connector._get_pages('issues')) == [[1], [2]]
+    assert requested == [1, 2]
+
+
+def test_get_notes_after_stops_on_old_and_removed_notes():
+    """
+    Test if notes are read newest-first until start date or removed time
+    """
+    connector = create_connector()
+
+    def note(note_id, created_at, body='added 1h of time spent'):
+        return {
+            'id': note_id,
+            'created_at': created_at,
+            'body': body
+        }
+
+    pages = [
+        [note(5, '2020-01-05T00:00:00Z'), note(4, '2020-01-04T00:00:00Z')],
+        [note(3, '2020-01-03T00:00:00Z'), note(2, '2019-12-30T00:00:00Z')],
+        [note(1, '2019-12-29T00:00:00Z')]
+    ]
+    fetched = []
+
+    def get_pages(endpoint, data=None):
+        for page in pages:
+            fetched.append(page)
+            yield page
+
+    connector._get_pages = get_pages
+
+    notes = connector.get_notes_after(1, 1, '2020-01-01T00:00:00+00:00')
+    assert [n['id'] for n in notes] == [3, 4, 5]
+    assert len(fetched) == 2
+
+    pages[0][1]['body'] = 'removed time spent'
+    del fetched[:]
+    notes = connector.get_notes_after(1, 1, '2020-01-01T00:00:00+00:00')
+    assert [n['id'] for n in notes] == [4, 5]
+    assert len(fetched) == 1
+
+
+def test_cached_worklogs_are_not_shared_between_tokens():
+    """
+    Test if worklogs fetched with one token are not returned for another
+    """
+    ISSUE_WORKLOGS_CACHE.clear()
+    scanned = []
+
+    def fetch(token):
+        connector = GitlabConnector(
+            server='gitlab.example.com', api_token=token, max_workers=1
+        )
+
+        def get_worklogs_from_issue(*args, **kwargs):
+            scanned.append(token)
+            return [{'source_id': token}]
+
+        connector.get_worklogs_from_issue = get_worklogs_from_issue
+        return connector.get_cached_worklogs_from_issue(
+            1, 1, 60, None, None
+        )
+
+    assert fetch('first') == [{'source_id': 'first'}]
+    assert fetch('second') == [{'source_id': 'second'}]
+    assert fetch('first') == [{'source_id': 'first'}]
+    assert scanned == ['first', 'second']
+
+
+def test_worklogs_without_date_are_not_cached():
+    """
+    Test if worklogs with current time instead of missed date are fetched
+    again on the next import
+    """
+    ISSUE_WORKLOGS_CACHE.clear()
+    connector = create_connector(max_workers=1)
+    scanned = []
+
+    def get_worklogs_from_issue(*args, **kwargs):
+        scanned.append(args[1])
+        return [
+            {'source_id': '1', 'is_date_missed': False},
+            {'source_id': '2', 'is_date_missed': args[1] == 1}
+        ]
+
+    connector.get_worklogs_from_issue = get_worklogs_from_issue
+
+    def fetch(issue_iid):
+        return connector.get_cached_worklogs_from_issue(
+            1, issue_iid, 60, None, None
+        )
+
+    for issue_iid in [1, 1, 2, 2]:
+        assert fetch(issue_iid) == [{'source_id': '1'}, {'source_id': '2'}]
+    assert scanned == [1, 1, 2]
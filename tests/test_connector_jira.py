@@ -1,3 +1,9 @@
+from datetime import datetime
+
+import pytest
+import pytz
+
+from synchronizer.connectors.base import ExportException, WrongIssueIDException
 from synchronizer.connectors.jira import JiraConnector
 
 
@@ -15,3 +21,90 @@ def test_round_seconds():
     assert JiraConnector.round_seconds(60) == 60
     assert JiraConnector.round_seconds(300) == 300
     assert JiraConnector.round_seconds(1021) == 1080
+
+
+def test_validate_issues_in_batches():
+    """
+    Test if issues are deduplicated and validated by batches
+    """
+    connector = JiraConnector(
+        server='jira.example.com', login='login', api_token='token'
+    )
+    connector.VALIDATE_BATCH_SIZE = 2
+    existing = {'ABC-1': '10001', 'ABC-2': '10002', 'ABC-3': '10003'}
+    requests = []
+
+    def post(endpoint, data, params=None):
+        requests.append(data['jql'])
+        issues = [
+            {'key': key, 'id': issue_id}
+            for key, issue_id in existing.items()
+            if '"{}"'.format(key) in data['jql']
+            or '"{}"'.format(issue_id) in data['jql']
+        ]
+        return {'issues': issues, 'total': len(issues)}
+
+    def get(endpoint, params=None):
+        raise WrongIssueIDException()
+
+    connector._post = post
+    connector._get = get
+
+    assert connector.validate_issues(
+        ['ABC-1', 'ABC-1', 'ABC-2', 'ABC-9', '10003', None]
+    ) == {'ABC-1', 'ABC-2', '10003'}
+    assert len(requests) == 2
+
+
+class FakeWorklog(object):
+    def __init__(self, issue_id):
+        self.issue_id = issue_id
+        self.date_started = datetime(2020, 1, 2, tzinfo=pytz.utc)
+        self.duration = 600
+        self.comment = 'Work'
+        self.is_valid = True
+
+    def update(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_export_worklogs_reports_not_exported_ones(monkeypatch, workers):
+    """
+    Test if worklogs with wrong issues are marked as invalid and indexes of
+    failed and not started ones are reported
+    """
+    connector = JiraConnector(
+        server='jira.example.com', login='login', api_token='token'
+    )
+    monkeypatch.setattr(connector, 'get_export_workers', lambda: workers)
+    exported = []
+
+    def post(endpoint, data, params=None):
+        issue_id = endpoint.split('/')[1]
+        if issue_id == 'WRONG-1':
+            raise WrongIssueIDException()
+        if issue_id == 'FAIL-1':
+            raise Exception('Server error')
+        exported.append(issue_id)
+
+    connector._post = post
+    worklogs = [FakeWorklog(i) for i in [
+        'ABC-1', 'WRONG-1', 'FAIL-1', 'ABC-2', 'ABC-3', 'ABC-4'
+    ]]
+
+    with pytest.raises(ExportException) as err:
+        connector.export_worklogs(worklogs)
+
+    # Every worklog is exported, invalid or reported as not exported
+    reported = set(err.value.indexes)
+    for i, worklog in enumerate(worklogs):
+        assert [
+            i in reported, worklog.issue_id in exported, not worklog.is_valid
+        ].count(True) == 1
+    assert 2 in reported
+    assert err.value.index == min(reported)
+
+    if workers == 1:
+        assert not worklogs[1].is_valid
+        assert err.value.indexes == [2, 3, 4, 5]
@@ -0,0 +1,45 @@
+from synchronizer.connectors.jira import JiraConnector
+from synchronizer.connectors.manager import ConnectorManager
+from synchronizer.models import Connector
+
+
+def test_connector_instances_are_pooled(monkeypatch, logged_in, target):
+    """
+    Test if connector is created once and recreated after changes
+    """
+    created = []
+    init = JiraConnector.__init__
+
+    def counting_init(self, **kwargs):
+        created.append(kwargs['api_token'])
+        init(self, **kwargs)
+
+    monkeypatch.setattr(JiraConnector, '__init__', counting_init)
+
+    reported = []
+    first = target.create_connector()
+    second = target.create_connector(progress_callback=reported.append)
+    assert created == ['token']
+    assert first is not second
+    assert first.auth is second.auth
+
+    # Progress is not shared between copies of pooled connector
+    second.report_progress(requests=1)
+    assert first.progress['requests'] == 0
+    assert reported == [
+        {'phase': None, 'done': 0, 'total': None, 'requests': 1}
+    ]
+
+    target.update(api_token='new token')
+    assert target.create_connector().auth.password == 'new token'
+    assert created == ['token', 'new token']
+
+    # Credentials changed by another process are noticed by fingerprint
+    ConnectorManager.POOL.set(
+        target.id, ('outdated', ConnectorManager.POOL.get(target.id)[1])
+    )
+    target.create_connector()
+    assert len(created) == 3
+
+    Connector.delete(target.id)
+    assert ConnectorManager.POOL.get(target.id) is None
@@ -0,0 +1,241 @@
+import xmlrpc.client
+
+from datetime import datetime
+
+import pytest
+import pytz
+
+from synchronizer.connectors.base import ExportException
+from synchronizer.connectors.odoo import (LOOKUP_CACHE, UID_CACHE,
+                                          OdooConnector, SessionTransport)
+
+
+class FakeServerProxy(object):
+    authenticated = []
+
+    def __init__(self, uri, transport=None):
+        self.uri = uri
+
+    def authenticate(self, db, username, password, user_agent_env):
+        self.authenticated.append((db, username, password))
+        return 1 if password == 'pass' else False
+
+
+class FakeWorklog(object):
+    def __init__(self, issue_id):
+        self.issue_id = issue_id
+        self.date_started = datetime(2020, 1, 2, tzinfo=pytz.utc)
+        self.duration = 1800
+        self.comment = 'Work'
+
+
+class FakeOdoo(object):
+    """
+    Answers requests of export like Odoo does
+    """
+    PROJECTS = [
+        {'id': 1, 'name': 'ABC', 'analytic_account_id': [11, 'ABC']},
+        {'id': 2, 'name': 'NOACC', 'analytic_account_id': False}
+    ]
+    TASKS = [
+        {'id': 101, 'project_id': [1, 'ABC'], 'ref_num': '1'},
+        {'id': 102, 'project_id': [1, 'ABC'], 'ref_num': '2'},
+        {'id': 103, 'project_id': [1, 'ABC'], 'ref_num': '3'}
+    ]
+
+    def __init__(self, is_batch_supported=True, failed_task_id=None):
+        self.is_batch_supported = is_batch_supported
+        self.failed_task_id = failed_task_id
+        self.requests = []
+        self.created = []
+
+    def __call__(self, method, endpoint, data=None, params=None):
+        self.requests.append((endpoint, method))
+        if method == 'search_read' and endpoint == 'project.project':
+            [[[_, _, names]]] = data
+            return [p for p in self.PROJECTS if p['name'] in names]
+        if method == 'search_read' and endpoint == 'project.task':
+            [domain] = data
+            pairs = [
+                (domain[i + 1][2], domain[i + 2][2])
+                for i, item in enumerate(domain) if item == '&'
+            ]
+            return [
+                t for t in self.TASKS
+                if (t['project_id'][0], t['ref_num']) in pairs
+            ]
+        if method == 'default_get':
+            return {'state': 'draft', 'journal_id': 5}
+        if method == 'create':
+            [timesheets] = data
+            if isinstance(timesheets, dict):
+                timesheets = [timesheets]
+            elif not self.is_batch_supported:
+                raise xmlrpc.client.Fault(1, 'Batch is not supported')
+            if any(t['task_id'] == self.failed_task_id for t in timesheets):
+                raise xmlrpc.client.Fault(2, 'Task is closed')
+            self.created += [t['task_id'] for t in timesheets]
+            return list(range(len(timesheets)))
+        raise AssertionError('Unexpected request {} {}'.format(
+            endpoint, method
+        ))
+
+
+@pytest.fixture
+def connector(monkeypatch):
+    monkeypatch.setattr(xmlrpc.client, 'ServerProxy', FakeServerProxy)
+    LOOKUP_CACHE.clear()
+    UID_CACHE.clear()
+    del FakeServerProxy.authenticated[:]
+    return OdooConnector(
+        server='http://odoo.example.com:db', login='login', password='pass'
+    )
+
+
+def test_export_worklogs_by_batches(connector):
+    """
+    Test if number of requests doesn't depend on number of worklogs
+    """
+    connector.EXPORT_BATCH_SIZE = 4
+    odoo = connector._api = FakeOdoo()
+    worklogs = [FakeWorklog('ABC#{}'.format(i % 3 + 1)) for i in range(10)]
+
+    connector.export_worklogs(worklogs)
+
+    assert odoo.created == [101 + i % 3 for i in range(10)]
+    assert odoo.requests == [
+        ('project.project', 'search_read'),
+        ('project.task', 'search_read'),
+        ('hr.analytic.timesheet', 'default_get'),
+        ('hr.analytic.timesheet', 'create'),
+        ('hr.analytic.timesheet', 'create'),
+        ('hr.analytic.timesheet', 'create')
+    ]
+    assert connector.progress['done'] == 10
+
+
+def test_export_worklogs_before_wrong_one(connector):
+    """
+    Test if worklogs before the first wrong one are exported and its index
+    is reported
+    """
+    for issue_id, message in [
+        ('ABC', 'Wrong issue ID'),
+        ('XYZ#1', 'No project ID found'),
+        ('NOACC#1', 'No analytic_account_id'),
+        ('ABC#9', 'Cannot found task ID')
+    ]:
+        odoo = connector._api = FakeOdoo()
+        worklogs = [FakeWorklog(i) for i in ['ABC#1', 'ABC#2', issue_id]]
+        worklogs.append(FakeWorklog('ABC#3'))
+
+        with pytest.raises(ExportException) as err:
+            connector.export_worklogs(worklogs)
+        assert err.value.index == 2
+        assert err.value.message.startswith(message)
+        assert odoo.created == [101, 102]
+
+
+@pytest.mark.parametrize('is_batch_supported', [True, False])
+def test_export_worklogs_finds_failed_one_of_batch(
+    connector, is_batch_supported
+):
+    """
+    Test if timesheets of failed batch are created one by one
+    """
+    connector.EXPORT_BATCH_SIZE = 2
+    odoo = connector._api = FakeOdoo(is_batch_supported, failed_task_id=103)
+    worklogs = [FakeWorklog('ABC#{}'.format(i)) for i in [1, 2, 1, 3, 2]]
+
+    with pytest.raises(ExportException) as err:
+        connector.export_worklogs(worklogs)
+    assert err.value.index == 3
+    assert err.value.message == 'Task is closed'
+    assert odoo.created == [101, 102, 101]
+
+
+def test_lookups_are_cached_per_server(connector):
+    """
+    Test if found projects and tasks are not requested again from the same
+    server and db, but are requested from another one
+    """
+    odoo = connector._api = FakeOdoo()
+    connector.export_worklogs([FakeWorklog('ABC#1'), FakeWorklog('ABC#2')])
+    del odoo.requests[:]
+
+    connector.export_worklogs([FakeWorklog('ABC#2')])
+    assert odoo.requests == [
+        ('hr.analytic.timesheet', 'default_get'),
+        ('hr.analytic.timesheet', 'create')
+    ]
+
+    for server in ['http://odoo.example.com:other', 'http://odoo2.com:db']:
+        other = OdooConnector(server=server, login='login', password='pass')
+        other_odoo = other._api = FakeOdoo()
+        other.export_worklogs([FakeWorklog('ABC#2')])
+        assert ('project.project', 'search_read') in other_odoo.requests
+        assert ('project.task', 'search_read') in other_odoo.requests
+
+
+def test_user_identifier_is_cached(connector):
+    """
+    Test if user is authenticated once per server, db, login and password
+    """
+    assert connector.uid == 1
+    assert connector.username == 'login'
+
+    def create(server='http://odoo.example.com:db', password='pass'):
+        return OdooConnector(server=server, login='login', password=password)
+
+    assert create().uid == 1
+    assert len(FakeServerProxy.authenticated) == 1
+
+    # Another db and wrong password are not cached
+    assert create(server='http://odoo.example.com:other').uid == 1
+    assert create(password='wrong').uid is False
+    assert create(password='wrong').uid is False
+    assert len(FakeServerProxy.authenticated) == 4
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, content=b''):
+        self.status_code = status_code
+        self.reason = 'Reason'
+        self.headers = {}
+        self.content = content
+
+
+class FakeHttpTransport(object):
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs['data']))
+        return self.response
+
+
+def test_session_transport():
+    """
+    Test if XML-RPC calls are sent with shared HTTP transport
+    """
+    http_transport = FakeHttpTransport(FakeResponse(
+        200, xmlrpc.client.dumps(([1, 2],), methodresponse=True).encode()
+    ))
+    proxy = xmlrpc.client.ServerProxy(
+        'https://odoo.example.com/xmlrpc/2/object',
+        transport=SessionTransport(http_transport, 'https')
+    )
+
+    assert proxy.execute_kw('db', 1, 'pass', 'project.task', 'search') \
+        == [1, 2]
+    [(method, url, data)] = http_transport.requests
+    assert method == 'POST'
+    assert url == 'https://odoo.example.com/xmlrpc/2/object'
+    assert xmlrpc.client.loads(data) == (
+        ('db', 1, 'pass', 'project.task', 'search'), 'execute_kw'
+    )
+
+    http_transport.response = FakeResponse(502)
+    with pytest.raises(xmlrpc.client.ProtocolError):
+        proxy.execute_kw('db', 1, 'pass', 'project.task', 'search')
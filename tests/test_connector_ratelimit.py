@@ -0,0 +1,116 @@
+from synchronizer.connectors.base import HttpTransport
+from synchronizer.connectors.ratelimit import RateLimiter
+
+
+class Clock(object):
+    """
+    Fake time shared by limiters, sleeping moves it forward
+    """
+    def __init__(self):
+        self.now = 1600000000.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse(object):
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def create_limiter(tmp_path, clock, **kwargs):
+    kwargs.setdefault('directory', str(tmp_path))
+    return RateLimiter(clock=clock.time, sleep=clock.sleep, **kwargs)
+
+
+def test_bucket_is_shared_by_limiters(tmp_path):
+    """
+    Test if limiters of different processes take tokens of the same host
+    """
+    clock = Clock()
+    first = create_limiter(tmp_path, clock, rate=2, burst=2)
+    second = create_limiter(tmp_path, clock, rate=2, burst=2)
+
+    assert first.acquire('jira.example.com') == 0
+    assert second.acquire('jira.example.com') == 0
+    assert second.acquire('gitlab.example.com') == 0
+    assert first.acquire('jira.example.com') == 0.5
+    assert clock.slept == [0.5]
+
+
+def test_rate_adapts_to_headers(tmp_path):
+    """
+    Test if limiter waits for Retry-After and spreads remaining quota
+    """
+    clock = Clock()
+    limiter = create_limiter(tmp_path, clock, rate=10, burst=10, max_wait=60)
+    host = 'jira.example.com'
+
+    assert limiter.update(host, FakeResponse(
+        429, {'Retry-After': '30'}
+    )) == 30
+    assert limiter.acquire(host) == 30
+    with limiter.state(host) as state:
+        assert state['rate'] == 5
+
+    # Successful responses restore rate step by step
+    limiter.update(host, FakeResponse())
+    with limiter.state(host) as state:
+        assert state['rate'] == 5.5
+
+    # 8 requests are left for the next 10 seconds (GitLab sends time
+    # of reset as UNIX time)
+    assert limiter.update(host, FakeResponse(200, {
+        'RateLimit-Remaining': '8',
+        'RateLimit-Reset': str(int(clock.now) + 10)
+    })) is None
+    with limiter.state(host) as state:
+        assert (state['rate'], state['tokens']) == (0.8, 8)
+
+    # Never waits too long
+    limiter.update(host, FakeResponse(429, {'Retry-After': '3600'}))
+    assert limiter.acquire(host) == 60
+
+
+def test_transport_retries_rejected_requests(tmp_path, monkeypatch):
+    """
+    Test if request rejected by rate limit is sent again after delay
+    """
+    clock = Clock()
+    transport = HttpTransport('test')
+    monkeypatch.setattr(
+        transport, 'rate_limiter', create_limiter(tmp_path, clock)
+    )
+    responses = [
+        FakeResponse(429, {'Retry-After': '2'}),
+        FakeResponse(201)
+    ]
+    monkeypatch.setattr(
+        transport.session, 'request',
+        lambda method, url, **kwargs: responses.pop(0)
+    )
+
+    response = transport.request('post', 'https://jira.example.com/api')
+    assert response.status_code == 201
+    assert clock.slept == [2]
+
+
+def test_limiter_works_without_state_files(tmp_path):
+    """
+    Test if state is kept in memory when its directory is not writable
+    """
+    clock = Clock()
+    not_directory = tmp_path / 'file'
+    not_directory.write_text('')
+    limiter = create_limiter(
+        tmp_path, clock, rate=1, burst=1, directory=str(not_directory)
+    )
+
+    assert limiter.acquire('jira.example.com') == 0
+    assert limiter.acquire('jira.example.com') == 1
@@ -0,0 +1,132 @@
+import os
+
+from contextlib import contextmanager
+
+import pytest
+
+from sqlalchemy import event
+
+from synchronizer.models import Synchronization, Worklog, db
+
+# Pages of list of worklogs, all of them and worklogs of a connector. Keys
+# of later pages are taken from the first ones
+PAGE_QUERIES = {
+    'worklogs': {'user_id': 7},
+    'worklogs of connector': {'user_id': 7, 'connector_id': 7},
+}
+
+# Queries of the views: validation, export and view of synchronization,
+# children of grouped worklogs and deletion of sync
+VIEW_QUERIES = {
+    'synchronization worklogs': lambda: Worklog.query.filter_by(
+        synchronization_id=7,
+        user_id=7,
+        parent_id=None
+    ).order_by(Worklog.date_started),
+    'worklogs to export': lambda: Worklog.query.filter(
+        Worklog.synchronization_id == 7,
+        Worklog.is_valid,
+        Worklog.parent_id == None  # NOQA
+    ),
+    'children': lambda: Worklog.query.filter(
+        Worklog.parent_id.in_([2, 5, 8])
+    ),
+    'synchronization deletion': lambda: Worklog.query.filter_by(
+        synchronization_id=7
+    ),
+    'synchronizations': lambda: Synchronization.query.filter_by(
+        user_id=7
+    ).order_by(Synchronization.date_created),
+}
+
+SEED_SQL = [
+    "INSERT INTO timezones (id, name) VALUES (1, 'UTC')",
+    "INSERT INTO connector_types (id, name, ctype) "
+    "VALUES (1, 'Jira', 'target')",
+    "INSERT INTO users (id, username, timezone_id) "
+    "SELECT g, 'user' || g, 1 FROM generate_series(1, 1000) g",
+    "INSERT INTO connectors (id, name, user_id, connector_type_id) "
+    "SELECT g, 'connector' || g, g, 1 FROM generate_series(1, 1000) g",
+    "INSERT INTO synchronizations "
+    "(id, source_id, target_id, date_started_from, user_id, date_created) "
+    "SELECT g, (g - 1) % 1000 + 1, (g - 1) % 1000 + 1, now(), "
+    "(g - 1) % 1000 + 1, now() - g * interval '1 hour' "
+    "FROM generate_series(1, 20000) g",
+    # Every third worklog is a child of the previous one
+    "INSERT INTO worklogs (id, synchronization_id, user_id, date_started, "
+    "date_stopped, duration, comment, source_id, issue_id, is_valid, "
+    "parent_id) "
+    "SELECT g, g % 20000 + 1, g % 1000 + 1, "
+    "now() - g * interval '1 minute', now() - g * interval '1 minute', "
+    "600, 'Work', g::text, 'ABC-' || g % 5000, g % 7 > 0, "
+    "CASE WHEN g % 3 = 0 THEN g - 1 END "
+    "FROM generate_series(1, 1000000) g",
+    "ANALYZE",
+]
+
+
+@contextmanager
+def capture_sql():
+    """
+    Collects SQL executed inside of the block with parameters inlined
+    """
+    statements = []
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        statements.append(cursor.mogrify(statement, parameters).decode())
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(
+            db.engine, 'before_cursor_execute', before_cursor_execute
+        )
+
+
+def get_page_sql(**kwargs):
+    """
+    Returns SQL of Worklog.get_page and the key of the next page
+    """
+    with capture_sql() as statements:
+        _, after = Worklog.get_page(**kwargs)
+    [sql] = statements
+    return sql, after
+
+
+@pytest.mark.skipif(
+    'postgresql' not in os.environ.get('TEST_DATABASE_URI', ''),
+    reason='requires Postgres, set TEST_DATABASE_URI'
+)
+def test_view_queries_use_indexes(app):
+    """
+    Test if queries of views don't scan the whole 1M rows worklogs table
+    """
+    for sql in SEED_SQL:
+        db.session.execute(sql)
+    db.session.commit()
+
+    queries = {}
+    for name, kwargs in PAGE_QUERIES.items():
+        queries[name], after = get_page_sql(**kwargs)
+        assert after
+        queries[name + ', later page'], _ = get_page_sql(
+            after=after, **kwargs
+        )
+    for name, query in VIEW_QUERIES.items():
+        queries[name] = str(query().statement.compile(
+            dialect=db.engine.dialect,
+            compile_kwargs={'literal_binds': True}
+        ))
+
+    seq_scans = []
+    for name, sql in queries.items():
+        plan = '\n'.join(
+            row[0] for row in db.session.execute('EXPLAIN ' + sql)
+        )
+        if 'Seq Scan' in plan:
+            seq_scans.append('{}:\n{}'.format(name, plan))
+
+    assert not seq_scans, '\n\n'.join(seq_scans)
@@ -0,0 +1,176 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from synchronizer.models import Issue, IssueUsage, Worklog, db
+from tests.test_models_worklog import raw_worklog
+
+
+class FakeConnector(object):
+    def __init__(self, existing):
+        self.existing = existing
+        self.checked = []
+
+    def validate_issues(self, issue_ids):
+        self.checked.append(set(issue_ids))
+        return set(i for i in issue_ids if i in self.existing)
+
+
+def test_validate_reads_through_cache(target):
+    """
+    Test if only issues missed in cache are checked in target
+    """
+    connector = FakeConnector({'ABC-1'})
+
+    assert Issue.validate(target, connector, ['ABC-1', 'ABC-2']) == {'ABC-1'}
+    assert Issue.validate(target, connector, ['ABC-1', 'ABC-2', 'ABC-3']) \
+        == {'ABC-1'}
+    assert connector.checked == [{'ABC-1', 'ABC-2'}, {'ABC-3'}]
+
+
+def test_not_existing_issues_expire_first(target):
+    """
+    Test if negative results are checked again after their TTL
+    """
+    connector = FakeConnector({'ABC-1'})
+    Issue.validate(target, connector, ['ABC-1', 'ABC-2'])
+
+    for issue in Issue.query:
+        issue.date_checked -= Issue.NOT_EXISTS_TTL + timedelta(minutes=1)
+    db.session.commit()
+
+    assert set(Issue.get_fresh(target, ['ABC-1', 'ABC-2'])) == {'ABC-1'}
+    Issue.validate(target, connector, ['ABC-1', 'ABC-2'])
+    assert connector.checked[-1] == {'ABC-2'}
+
+
+def test_store_upserts_issues(target):
+    """
+    Test if stored issues are updated and summary is kept if not known
+    """
+    Issue.store(target, {'ABC-1': (True, 'First'), 'ABC-2': (True, 'Two')})
+    Issue.store(target, {'ABC-1': (False, None), 'ABC-3': (True, None)})
+
+    issues = {i.issue_id: (i.is_exists, i.summary) for i in Issue.query}
+    assert issues == {
+        'ABC-1': (False, 'First'),
+        'ABC-2': (True, 'Two'),
+        'ABC-3': (True, None)
+    }
+
+
+def test_search_matches_wildcards_as_is(target):
+    """
+    Test if LIKE wildcards in term are matched as usual characters
+    """
+    Issue.store(target, {
+        'ABC-1': (True, '100% done'),
+        'ABC_2': (True, 'Fix C:\\temp'),
+        'ABCD': (True, 'Other')
+    })
+
+    def search(term):
+        return [i['id'] for i in Issue.search(target, term)]
+
+    assert search('ABC_') == ['ABC_2']
+    assert search('%') == ['ABC-1']
+    assert search('0% d') == ['ABC-1']
+    assert search('C:\\t') == ['ABC_2']
+    assert set(search('ABC')) == {'ABC-1', 'ABC_2', 'ABCD'}
+
+
+def test_issue_usages_are_counted_by_imports(logged_in, sync, target):
+    """
+    Test if issues of imported groups of worklogs are suggested by
+    frequency and recency
+    """
+    def suggested(term='abc'):
+        return [i['id'] for i in IssueUsage.suggest(
+            logged_in.id, target, term
+        )]
+
+    Worklog.create_from_batches(sync.id, [
+        [raw_worklog(1, '[Jira:ABC-1] Work', 10)],
+        [
+            raw_worklog(2, '[Jira:ABC-1] Work', 11),
+            raw_worklog(3, '[Jira:ABC-2] Review', 12),
+            raw_worklog(4, '[Jira:ABC-2] Meeting', 13),
+        ],
+    ], 'Jira')
+    assert suggested() == ['ABC-2', 'ABC-1']
+    assert suggested('ABC-1') == ['ABC-1']
+    assert suggested('ABC_') == []
+
+    # One recent use outweighs older ones
+    IssueUsage.record(logged_in.id, target.id, added=[
+        ('ABC-3', datetime(2020, 3, 1, tzinfo=pytz.utc))
+    ])
+    assert suggested() == ['ABC-3', 'ABC-2', 'ABC-1']
+
+    # Worklog was moved to another issue, not existing issues are skipped
+    IssueUsage.record(logged_in.id, target.id, removed=[
+        ('ABC-3', datetime(2020, 3, 1, tzinfo=pytz.utc))
+    ])
+    Issue.store(target, {'ABC-2': (False, None)})
+    assert suggested() == ['ABC-1']
+    assert IssueUsage.query.count() == 2
+
+
+def test_issue_usages_of_deleted_worklogs_are_removed(logged_in, sync):
+    """
+    Test if re-imported worklogs are not counted twice and deleted ones
+    are not counted at all
+    """
+    def usages():
+        return sorted((u.issue_id, u.count) for u in IssueUsage.query)
+
+    def import_worklogs():
+        Worklog.create_all(sync.id, [
+            raw_worklog(1, '[Jira:ABC-1] Work', 10),
+            raw_worklog(2, '[Jira:ABC-1] Work', 11),
+            raw_worklog(3, '[Jira:ABC-2] Review', 12),
+        ], 'Jira')
+
+    import_worklogs()
+    assert usages() == [('ABC-1', 1), ('ABC-2', 1)]
+
+    # Cancelled or failed import is run again
+    Worklog.delete_from_sync(sync.id)
+    assert usages() == []
+    import_worklogs()
+    assert usages() == [('ABC-1', 1), ('ABC-2', 1)]
+
+    # Child of a group is not a use of issue, its parent is
+    child = Worklog.query.filter(Worklog.parent_id != None).first()  # NOQA
+    Worklog.delete(child.id)
+    assert usages() == [('ABC-1', 1), ('ABC-2', 1)]
+    Worklog.delete(Worklog.query.filter_by(issue_id='ABC-2').one().id)
+    assert usages() == [('ABC-1', 1)]
+
+
+def test_forgotten_uses_restore_rank(logged_in, sync, target):
+    """
+    Test if rank of issue returns to its value before import when the
+    imported worklogs are deleted
+    """
+    IssueUsage.record(logged_in.id, target.id, added=[
+        ('ABC-1', datetime(2020, 1, 1, tzinfo=pytz.utc))
+    ])
+    rank = IssueUsage.query.one().rank
+
+    # The group starts earlier after the second batch
+    Worklog.create_from_batches(sync.id, [
+        [raw_worklog(1, '[Jira:ABC-1] Work', 15)],
+        [
+            raw_worklog(2, '[Jira:ABC-1] Work', 10),
+            raw_worklog(3, '[Jira:ABC-1] Review', 12)
+        ],
+    ], 'Jira')
+    assert IssueUsage.query.one().count == 3
+    assert IssueUsage.query.one().rank > rank
+
+    Worklog.delete_from_sync(sync.id)
+    usage = IssueUsage.query.one()
+    assert usage.count == 1
+    assert usage.rank == pytest.approx(rank)
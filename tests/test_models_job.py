@@ -0,0 +1,211 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+import synchronizer.views.api as api
+from synchronizer.connectors.base import ExportException
+from synchronizer.connectors.manager import ConnectorManager
+from synchronizer.models import (IssueUsage, Job, Synchronization, Worklog,
+                                 db)
+from synchronizer.worker import run_jobs
+
+
+class FakeConnector(object):
+    def __init__(self, worklogs=None, existing=(), error=None):
+        self.worklogs = worklogs or []
+        self.existing = set(existing)
+        self.error = error
+
+    def iter_worklogs(self, start_date, end_date):
+        if self.error:
+            raise self.error
+        for worklog in self.worklogs:
+            yield [worklog]
+
+    def clone(self, progress_callback=None):
+        return self
+
+    def export_worklogs(self, worklogs):
+        if self.error:
+            raise self.error
+
+    def validate_issues(self, issue_ids):
+        return set(i for i in issue_ids if i in self.existing)
+
+
+def use_connector(monkeypatch, connector):
+    ConnectorManager.POOL.clear()
+    monkeypatch.setattr(
+        ConnectorManager, 'create_connector',
+        staticmethod(lambda connector_name, **kwargs: connector)
+    )
+
+
+def raw_worklog(source_id, comment):
+    date_started = datetime(2020, 1, 2, 10, tzinfo=pytz.utc)
+    return {
+        'source_id': str(source_id),
+        'comment': comment,
+        'duration': 600,
+        'date_created': date_started,
+        'date_started': date_started,
+        'date_stopped': date_started + timedelta(seconds=600)
+    }
+
+
+def test_import_job_runs_without_request(monkeypatch, sync):
+    """
+    Test if worker imports and validates worklogs of synchronization user
+    """
+    use_connector(monkeypatch, FakeConnector([
+        raw_worklog(1, '[Jira:ABC-1] Work'),
+        raw_worklog(2, '[Jira:ABC-2] Other work'),
+    ], existing={'ABC-1'}))
+    job = Job.create(
+        synchronization_id=sync.id, action=Job.ACTION_IMPORT
+    )
+    job_id, sync_id = job.id, sync.id
+    assert Job.get_active(sync_id).id == job_id
+
+    run_jobs('test', once=True)
+
+    job = Job.query.get(job_id)
+    assert (job.state, job.progress, job.worker) \
+        == (Job.STATE_DONE, 100, 'test')
+    assert Job.get_active(sync_id) is None
+    assert sorted(
+        (w.issue_id, w.is_valid) for w in Worklog.query
+    ) == [('ABC-1', True), ('ABC-2', False)]
+
+
+def test_failed_import_job_cancels_synchronization(monkeypatch, sync):
+    """
+    Test if error of import is saved and synchronization is not left active
+    """
+    use_connector(monkeypatch, FakeConnector(error=Exception('No access')))
+    job = Job.create(synchronization_id=sync.id, action=Job.ACTION_IMPORT)
+
+    assert not Job.claim('test').run()
+    assert (job.state, job.error) == (Job.STATE_FAILED, 'No access')
+    assert Synchronization.query.get(job.synchronization_id).is_cancelled
+
+
+def test_failed_export_job_deletes_not_exported_worklogs(
+    monkeypatch, sync
+):
+    """
+    Test if only worklogs reported by parallel export are deleted together
+    with their children and uses of their issues
+    """
+    use_connector(monkeypatch, FakeConnector(
+        [
+            raw_worklog(i, '[Jira:ABC-{}] Work'.format(i % 3))
+            for i in [0, 1, 4, 2]
+        ],
+        existing={'ABC-0', 'ABC-1', 'ABC-2'},
+        error=None
+    ))
+    job = Job.create(synchronization_id=sync.id, action=Job.ACTION_IMPORT)
+    assert Job.claim('test').run()
+
+    use_connector(monkeypatch, FakeConnector(
+        error=ExportException(1, indexes=[1])
+    ))
+    job = Job.create(synchronization_id=sync.id, action=Job.ACTION_EXPORT)
+    assert not Job.claim('test').run()
+    assert job.state == Job.STATE_FAILED
+    assert sorted(w.issue_id for w in Worklog.query) == ['ABC-0', 'ABC-2']
+    assert sorted(u.issue_id for u in IssueUsage.query) == ['ABC-0', 'ABC-2']
+
+
+def test_deleted_synchronization_does_not_stop_worker(monkeypatch, sync):
+    """
+    Test if job of synchronization deleted while it's running fails
+    without breaking the worker
+    """
+    class DeletingConnector(FakeConnector):
+        def iter_worklogs(self, start_date, end_date):
+            db.session.delete(Synchronization.query.get(sync_id))
+            db.session.commit()
+            raise Exception('Synchronization is deleted')
+
+    use_connector(monkeypatch, DeletingConnector())
+    sync_id = sync.id
+    Job.create(synchronization_id=sync_id, action=Job.ACTION_IMPORT)
+    Job.create(synchronization_id=sync_id, action=Job.ACTION_IMPORT)
+
+    run_jobs('test', once=True)
+    # Jobs are deleted with synchronization where foreign keys are enforced
+    assert all(job.state == Job.STATE_FAILED for job in Job.query)
+    assert Job.claim('test') is None
+
+
+def test_progress_of_connector_is_saved(sync):
+    """
+    Test if progress is scaled to part of job and saved not too often
+    """
+    job = Job.create(synchronization_id=sync.id, action=Job.ACTION_IMPORT)
+    callback = job.get_progress_callback(50, 100)
+
+    def saved_progress():
+        db.session.expire_all()
+        return (job.phase, job.progress, job.items_done, job.requests_count)
+
+    callback({'phase': 'Validating', 'done': 1, 'total': 4, 'requests': 1})
+    assert saved_progress() == ('Validating', 62, 1, 1)
+
+    # Too early to save again, but the last item is always saved
+    callback({'phase': 'Validating', 'done': 2, 'total': 4, 'requests': 2})
+    assert saved_progress() == ('Validating', 62, 1, 1)
+    callback({'phase': 'Validating', 'done': 4, 'total': 4, 'requests': 3})
+    assert saved_progress() == ('Validating', 100, 4, 3)
+
+
+def test_progress_stream_is_closed_when_job_is_finished(
+    monkeypatch, app, user, sync
+):
+    """
+    Test if progress of job is sent as Server-Sent Events
+    """
+    job = Job.create(synchronization_id=sync.id, action=Job.ACTION_EXPORT)
+    job.update(state=Job.STATE_DONE, progress=100)
+
+    app.register_blueprint(api.api_routes, url_prefix='/api')
+    app.config['LOGIN_DISABLED'] = True
+    monkeypatch.setattr(api, 'current_user', user)
+
+    response = app.test_client().get(
+        '/api/synchronizations/{}/progress'.format(sync.id)
+    )
+    assert response.mimetype == 'text/event-stream'
+    events = response.get_data(as_text=True).split('\n\n')
+    assert events[0] == 'retry: {}'.format(api.PROGRESS_STREAM_RETRY)
+    assert events[1].startswith('data: {')
+    assert '"state": "done"' in events[1]
+    assert events[2:] == ['']
+
+
+def test_job_is_claimed_once(sync):
+    """
+    Test if a job is taken by one worker only, unless the worker died
+    """
+    job = Job.create(synchronization_id=sync.id, action=Job.ACTION_EXPORT)
+    job_id = job.id
+
+    assert Job.claim('first').id == job_id
+    assert Job.claim('second') is None
+
+    # Long running job reports progress
+    long_ago = datetime.utcnow() - Job.TIMEOUT - timedelta(minutes=1)
+    Job.query.get(job_id).update(date_started=long_ago)
+    Job.query.get(job_id).get_progress_callback(0, 100)(
+        {'phase': 'Exporting', 'done': 1, 'total': 2, 'requests': 1}
+    )
+    assert Job.claim('second') is None
+
+    Job.query.get(job_id).update(date_heartbeat=long_ago)
+    assert Job.claim('second').worker == 'second'
+
+    db.session.delete(Job.query.get(job_id))
+    db.session.commit()
+    assert Job.claim('third') is None
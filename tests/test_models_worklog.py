@@ -0,0 +1,261 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from synchronizer.models import Synchronization, Worklog, db
+from tests.conftest import count_queries
+
+
+def raw_worklog(source_id, comment, hour, duration=600):
+    date_started = datetime(2020, 1, 2, hour, tzinfo=pytz.utc)
+    return {
+        'source_id': str(source_id),
+        'comment': comment,
+        'duration': duration,
+        'date_created': date_started,
+        'date_started': date_started,
+        'date_stopped': date_started + timedelta(seconds=duration)
+    }
+
+
+def test_create_all_groups_worklogs(logged_in, sync):
+    """
+    Test if worklogs with the same date, issue and comment get a parent
+    """
+    Worklog.create_all(sync.id, [
+        raw_worklog(1, '[Jira:ABC-1] Work', 10),
+        raw_worklog(2, '[Jira:ABC-2] Other work', 11),
+        raw_worklog(3, '[Jira:ABC-1] Work', 12),
+        raw_worklog(4, 'No issue', 13),
+    ], 'Jira')
+
+    parents = Worklog.query.filter_by(parent_id=None) \
+        .order_by(Worklog.date_started).all()
+    assert [(p.issue_id, p.duration, p.is_valid) for p in parents] == [
+        ('ABC-1', 1200, True),
+        ('ABC-2', 600, True),
+        (None, 600, False),
+    ]
+    assert parents[0].source_id is None
+    assert sorted(c.source_id for c in parents[0].children) == ['1', '3']
+    assert Worklog.query.count() == 5
+
+
+def test_create_all_skips_existing_worklogs(logged_in, sync):
+    """
+    Test if already imported worklogs are not imported again
+    """
+    Worklog.create_all(
+        sync.id, [raw_worklog(1, '[Jira:ABC-1] Work', 10)], 'Jira'
+    )
+    Worklog.create_all(sync.id, [
+        raw_worklog(1, '[Jira:ABC-1] Work', 10),
+        raw_worklog(2, '[Jira:ABC-1] Work', 11),
+        raw_worklog(2, '[Jira:ABC-1] Work', 11),
+    ], 'Jira')
+
+    assert sorted(w.source_id for w in Worklog.query) == ['1', '2']
+
+
+def test_deleted_group_is_imported_again(logged_in, sync):
+    """
+    Test if children of deleted parent are deleted too, so the group is
+    imported again
+    """
+    def import_worklogs():
+        Worklog.create_all(sync.id, [
+            raw_worklog(1, '[Jira:ABC-1] Work', 10),
+            raw_worklog(2, '[Jira:ABC-1] Work', 11),
+        ], 'Jira')
+
+    import_worklogs()
+    parent = Worklog.query.filter_by(parent_id=None).one()
+    Worklog.delete(parent.id)
+    assert Worklog.query.count() == 0
+
+    import_worklogs()
+    parent = Worklog.query.filter_by(parent_id=None).one()
+    assert sorted(c.source_id for c in parent.children) == ['1', '2']
+
+
+def test_synchronization_worklogs_are_loaded_with_children(logged_in, sync):
+    """
+    Test if the whole tree of worklogs is loaded by two queries
+    """
+    Worklog.create_all(sync.id, [
+        raw_worklog(i, '[Jira:ABC-{}] Work'.format(i // 2), i % 24)
+        for i in range(100)
+    ], 'Jira')
+    sync_id, user_id = sync.id, logged_in.id
+    db.session.expunge_all()
+
+    sync = Synchronization.get_with_target(sync_id)
+    with count_queries() as queries:
+        worklogs = sync.get_worklogs(user_id)
+        children = [c for w in worklogs for c in w.children]
+        sync.target.connector_type.name
+
+    assert len(worklogs) == 50
+    assert len(children) == 100
+    assert len(queries) == 2
+
+
+def test_synchronization_totals_are_aggregated_in_sql(logged_in, sync):
+    """
+    Test if totals of synchronizations are calculated without worklog rows
+    """
+    Worklog.create_all(sync.id, [
+        raw_worklog(1, '[Jira:ABC-1] Work', 10),
+        raw_worklog(2, '[Jira:ABC-1] Work', 11, duration=1200),
+        raw_worklog(3, '[Jira:ABC-2] Other work', 12),
+        raw_worklog(4, 'No issue', 13, duration=300),
+    ], 'Jira')
+    other = Synchronization.create(
+        source_id=sync.source_id,
+        target_id=sync.target_id,
+        date_started_from=sync.date_started_from,
+        user_id=logged_in.id
+    )
+    sync_ids, user_id = [sync.id, other.id], logged_in.id
+
+    with count_queries() as queries:
+        totals = Synchronization.get_totals(sync_ids, user_id)
+    assert len(queries) == 1
+    assert totals[sync.id] == {
+        'count': 3,
+        'synchronized_count': 2,
+        'skipped_count': 1,
+        'synchronized': 2400,
+        'skipped': 300
+    }
+    assert totals[other.id]['count'] == 0
+
+    summary = sync.get_summary(logged_in.id)
+    assert summary['totals'] == totals[sync.id]
+    assert [(d['day'], d['count']) for d in summary['days']] \
+        == [('2020-01-02', 3)]
+    assert [
+        (i['issue_id'], i['synchronized'], i['skipped'])
+        for i in summary['issues']
+    ] == [('ABC-1', 1800, 0), ('ABC-2', 600, 0), (None, 0, 300)]
+
+
+def test_worklogs_are_paginated_by_keys(logged_in, sync):
+    """
+    Test if pages of worklogs don't overlap, even with equal start dates
+    """
+    Worklog.create_all(sync.id, [
+        raw_worklog(i, '[Jira:ABC-{}] Work'.format(i), i % 3)
+        for i in range(25)
+    ], 'Jira')
+    user_id = logged_in.id
+
+    for descending in (True, False):
+        pages, after = [], None
+        while True:
+            page, after = Worklog.get_page(
+                user_id, after=after, limit=10, descending=descending
+            )
+            pages.append(page)
+            if not after:
+                break
+
+        assert [len(page) for page in pages] == [10, 10, 5]
+        keys = [(w.date_started, w.id) for page in pages for w in page]
+        assert keys == sorted(keys, reverse=descending)
+        assert len(set(keys)) == 25
+
+    page, after = Worklog.get_page(
+        user_id, issue_id='ABC-3', is_valid=True, sync_id=sync.id
+    )
+    assert [w.issue_id for w in page] == ['ABC-3']
+    assert after is None
+
+    date_from = datetime(2020, 1, 2, 1, tzinfo=pytz.utc)
+    page, _ = Worklog.get_page(user_id, date_from=date_from)
+    assert len(page) == 16
+
+
+def test_synchronization_worklogs_are_deleted_by_one_query(logged_in, sync):
+    """
+    Test if cancel and delete don't load worklogs of synchronization,
+    only uses of issues are counted by SQL
+    """
+    Worklog.create_all(sync.id, [
+        raw_worklog(i, '[Jira:ABC-{}] Work'.format(i // 2), i % 24)
+        for i in range(100)
+    ], 'Jira')
+    # Load expired attributes to count only queries of deletion
+    sync_id, _ = sync.id, logged_in.id
+
+    with count_queries() as queries:
+        assert sync.cancel()
+    worklog_queries = [q for q in queries if 'FROM worklogs' in q]
+    assert len(worklog_queries) == 2
+    assert 'GROUP BY' in worklog_queries[0]
+    assert worklog_queries[1].startswith('DELETE FROM worklogs')
+    assert Worklog.query.count() == 0
+
+    Worklog.create_all(sync_id, [raw_worklog(1, '[Jira:ABC-1] Work', 10)],
+                       'Jira')
+    db.session.expire_all()
+    with count_queries() as queries:
+        Synchronization.delete(sync_id)
+    assert not any(
+        q.startswith('SELECT worklogs') and 'GROUP BY' not in q
+        for q in queries
+    )
+    assert Worklog.query.count() == 0
+    assert Synchronization.query.get(sync_id) is None
+
+
+def test_worklogs_from_batches_are_grouped_like_at_once(logged_in, sync):
+    """
+    Test if groups continued in next batches get the same parents
+    """
+    def tree():
+        parents = [(
+            p.issue_id, p.duration, str(p.date_started), str(p.date_stopped),
+            sorted(c.source_id for c in p.children)
+        ) for p in Worklog.query.filter_by(parent_id=None)]
+        return sorted(parents, key=str)
+
+    def batches():
+        yield [raw_worklog(1, '[Jira:ABC-1] Work', 10)]
+        yield [
+            raw_worklog(2, '[Jira:ABC-1] Work', 11),
+            raw_worklog(3, '[Jira:ABC-2] Other work', 11),
+        ]
+        yield [
+            raw_worklog(4, '[Jira:ABC-1] Work', 12, duration=1200),
+            raw_worklog(5, '[Jira:ABC-2] Other work', 9),
+            raw_worklog(6, 'No issue', 13),
+        ]
+
+    Worklog.create_all(
+        sync.id, [w for batch in batches() for w in batch], 'Jira'
+    )
+    at_once = tree()
+    Worklog.delete_from_sync(sync.id)
+
+    Worklog.create_from_batches(sync.id, batches(), 'Jira')
+    assert tree() == at_once
+    assert [p[:2] for p in at_once] == [
+        ('ABC-1', 2400), ('ABC-2', 1200), (None, 600)
+    ]
+    assert Worklog.query.count() == 8
+
+
+def test_worklog_with_valid_duplicate_is_found(logged_in, sync):
+    """
+    Test if invalid worklog imported again with issue has a valid duplicate
+    """
+    Worklog.create_all(sync.id, [raw_worklog(1, 'No issue', 10)], 'Jira')
+    Worklog.create_all(
+        sync.id, [raw_worklog(1, '[Jira:ABC-1] No issue', 10)], 'Jira'
+    )
+
+    invalid = Worklog.query.filter_by(is_valid=False).one()
+    valid = Worklog.query.filter_by(is_valid=True).one()
+    assert invalid.has_valid_duplicates()
+    assert not valid.has_valid_duplicates()